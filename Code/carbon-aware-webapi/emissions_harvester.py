@@ -0,0 +1,198 @@
+import argparse
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from emissions_io import open_emissions_writer
+
+DEFAULT_URL = "http://localhost:5073/emissions/bylocation"
+DEFAULT_START_DATE = datetime(2021, 1, 1)
+DEFAULT_WORKERS = 8
+
+# Function to generate date ranges in 10-day intervals
+def generate_date_ranges(start, end):
+    while start < end:
+        yield start, min(start + timedelta(days=9), end)
+        start += timedelta(days=10)
+
+# Function to display a simple progress bar
+def print_progress_bar(iteration, total, prefix='', suffix='', length=50, fill='█'):
+    percent = ("{0:.1f}").format(100 * (iteration / float(total)))
+    filled_length = int(length * iteration // total)
+    bar = fill * filled_length + '-' * (length - filled_length)
+    print(f'\r{prefix} |{bar}| {percent}% {suffix}', end='\r')
+    if iteration == total:
+        print()
+
+
+class Checkpoint:
+    """
+    Directory with one JSON file per finished (location, window) chunk.
+    A chunk is only written once its request succeeded, so a rerun skips every
+    chunk that has a file and retries everything else.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(location, start, end):
+        return f"{location}_{start.strftime('%Y-%m-%d')}_{end.strftime('%Y-%m-%d')}"
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def is_done(self, key):
+        return os.path.exists(self.path(key))
+
+    def save(self, key, records):
+        # Write to a temporary file first so an interrupted run never leaves a half written chunk behind
+        tmp_path = self.path(key) + ".tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump(records, file)
+        os.replace(tmp_path, self.path(key))
+
+    def load(self, key):
+        with open(self.path(key), 'r') as file:
+            return json.load(file)
+
+
+def make_session(pool_size):
+    """
+    Create a session whose connection pool is large enough for every worker to keep its connection alive.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def fetch_chunk(session, url, location, start, end, timeout=60):
+    """
+    Fetch the emissions of a single location for a single window and keep only the fields we store.
+    Raises requests.RequestException if the request fails or returns a non 200 status code.
+    """
+    params = {
+        "location": location,
+        "time": start.strftime('%Y-%m-%d'),
+        "toTime": end.strftime('%Y-%m-%d')
+    }
+    response = session.get(url, params=params, timeout=timeout)
+    response.raise_for_status()
+    return [
+        {
+            "location": item["location"],
+            "time": item["time"],
+            "rating": item["rating"],
+            "duration": item["duration"]
+        } for item in response.json()
+    ]
+
+
+def is_permanent_failure(error):
+    """
+    Whether retrying the request cannot help: a 4xx answer (e.g. "Unknown Location") other than 408 and 429.
+    """
+    response = getattr(error, "response", None)
+    return response is not None and 400 <= response.status_code < 500 and response.status_code not in (408, 429)
+
+
+def harvest(locations, output_path, url=DEFAULT_URL, start_date=DEFAULT_START_DATE, end_date=None,
+            workers=DEFAULT_WORKERS, checkpoint_dir=None, timeout=60, allow_partial=True):
+    """
+    Fetch every (location, 10-day window) chunk with up to `workers` requests in flight.
+
+    Finished chunks are recorded in `checkpoint_dir` (defaults to `<output_path>.parts`), so rerunning
+    after a crash or after failed chunks only requests the missing ones. A chunk the API permanently
+    rejects (a 4xx answer) is finished without records, like an empty answer. The output file is streamed
+    in the format given by its extension (see emissions_io), with the chunks fetched so far if
+    `allow_partial`, otherwise only once every chunk has been fetched.
+
+    :return: The list of (location, start, end) chunks that failed, empty on success.
+    """
+    if end_date is None:
+        end_date = datetime.now() - timedelta(days=1)  # Yesterday
+    if checkpoint_dir is None:
+        checkpoint_dir = output_path + ".parts"
+    checkpoint = Checkpoint(checkpoint_dir)
+
+    chunks = [(location, start, end)
+              for location in locations
+              for start, end in generate_date_ranges(start_date, end_date)]
+    pending = [chunk for chunk in chunks if not checkpoint.is_done(Checkpoint.key(*chunk))]
+
+    print("Starting data fetch process...")
+    print(f"{len(chunks) - len(pending)} of {len(chunks)} chunks already completed, fetching {len(pending)} with {workers} workers")
+
+    failed = []
+    current_iteration = 0
+    if pending:
+        with make_session(workers) as session, ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(fetch_chunk, session, url, *chunk, timeout=timeout): chunk for chunk in pending}
+            for future in as_completed(futures):
+                location, start, end = chunk = futures[future]
+                try:
+                    records = future.result()
+                except (requests.RequestException, ValueError) as error:
+                    if is_permanent_failure(error):
+                        # Retrying cannot help, record the chunk as finished without data
+                        print(f"\nNo data for {location} from {start.strftime('%Y-%m-%d')} to {end.strftime('%Y-%m-%d')}: {error}")
+                        checkpoint.save(Checkpoint.key(*chunk), [])
+                    else:
+                        failed.append(chunk)
+                        print(f"\nFailed to fetch data for {location} from {start.strftime('%Y-%m-%d')} to {end.strftime('%Y-%m-%d')}: {error}")
+                else:
+                    checkpoint.save(Checkpoint.key(*chunk), records)
+
+                # Update progress
+                current_iteration += 1
+                print_progress_bar(current_iteration, len(pending), prefix='Progress:', suffix='Complete', length=50)
+
+    if failed:
+        print(f"\n{len(failed)} chunks failed, rerun the same command to retry them. Completed chunks are kept in {checkpoint_dir}")
+        if not allow_partial:
+            return failed
+
+    # Stream the finished chunks in (location, window) order into the output, one chunk in memory at a time
+    failed_keys = {Checkpoint.key(*chunk) for chunk in failed}
+    with open_emissions_writer(output_path) as writer:
+        for chunk in chunks:
+            key = Checkpoint.key(*chunk)
+            if key not in failed_keys:
+                writer.write_many(checkpoint.load(key))
+
+    if failed:
+        print(f"{writer.count} records of the finished chunks saved to {output_path}")
+    else:
+        print("\nData fetch process completed successfully.")
+        print(f"{writer.count} records saved to {output_path}")
+    return failed
+
+
+def harvest_main(locations, output_path):
+    """
+    Command line entry point shared by the harvesting scripts.
+    """
+    parser = argparse.ArgumentParser(description="Fetch historical emissions for a list of locations from the Carbon Aware WebApi.")
+    parser.add_argument("--url", default=DEFAULT_URL, help="emissions/bylocation endpoint of the WebApi")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="maximum number of requests in flight")
+    parser.add_argument("--start-date", type=datetime.fromisoformat, default=DEFAULT_START_DATE, help="first day to fetch (YYYY-MM-DD)")
+    parser.add_argument("--end-date", type=datetime.fromisoformat, default=None, help="last day to fetch (YYYY-MM-DD), defaults to yesterday")
+    parser.add_argument("--checkpoint-dir", default=None, help="directory recording the finished chunks, defaults to <output>.parts")
+    parser.add_argument("--output", default=output_path, help="file the harvested data is streamed to (.ndjson.gz, .ndjson.zst, .ndjson or legacy .json)")
+    parser.add_argument("--allow-partial", action=argparse.BooleanOptionalAction, default=True,
+                        help="write the finished chunks even if some chunks failed (default: on)")
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    failed = harvest(locations, args.output, url=args.url, start_date=args.start_date, end_date=args.end_date,
+                     workers=args.workers, checkpoint_dir=args.checkpoint_dir, allow_partial=args.allow_partial)
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,183 @@
+import csv
+import gzip
+import io
+import json
+import os
+from contextlib import contextmanager
+
+try:
+    import zstandard
+except ImportError:  # zstd output is optional, gzip is always available
+    zstandard = None
+
+# Preferred format of harvested data: one compact JSON record per line, gzip compressed
+DEFAULT_SUFFIX = ".ndjson.gz"
+LEGACY_SUFFIX = ".json"
+
+_READ_CHUNK_SIZE = 1 << 16
+
+
+def _open_binary(path, mode, file_path=None):
+    # The compression is chosen from `path`, the bytes go to `file_path` when given
+    file_path = file_path or path
+    if path.endswith(".gz"):
+        return gzip.open(file_path, mode + "b")
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise ImportError("Reading or writing .zst files requires the 'zstandard' package")
+        raw = open(file_path, mode + "b")
+        if mode == "w":
+            return zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+        return zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+    return open(file_path, mode + "b")
+
+
+def _is_ndjson(path):
+    return any(path.endswith(".ndjson" + ext) for ext in ("", ".gz", ".zst"))
+
+
+class EmissionsWriter:
+    """
+    Writes emissions records one by one, so memory use does not depend on the size of the harvest.
+    `.ndjson`, `.ndjson.gz` and `.ndjson.zst` paths get one record per line, any other path gets
+    the legacy `{"Emissions": [...]}` document.
+    """
+
+    def __init__(self, path, write_path=None):
+        # The format always follows `path`, `write_path` lets the data go to a temporary file first
+        self.path = path
+        self.count = 0
+        self._ndjson = _is_ndjson(path)
+        self._file = io.TextIOWrapper(_open_binary(path, "w", write_path), encoding="utf-8")
+        if not self._ndjson:
+            self._file.write('{"Emissions": [')
+
+    def write(self, record):
+        line = json.dumps(record, separators=(",", ":"))
+        if self._ndjson:
+            self._file.write(line + "\n")
+        else:
+            self._file.write(("," if self.count else "") + "\n" + line)
+        self.count += 1
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+
+    def close(self):
+        if not self._ndjson:
+            self._file.write("\n]}\n")
+        self._file.close()
+
+
+@contextmanager
+def open_emissions_writer(path):
+    """
+    Context manager that streams records into `path`. The file is written to a temporary name and
+    only renamed into place once every record has been written.
+    """
+    tmp_path = path + ".tmp"
+    writer = EmissionsWriter(path, tmp_path)
+    try:
+        yield writer
+    except BaseException:
+        writer.close()
+        os.remove(tmp_path)
+        raise
+    writer.close()
+    os.replace(tmp_path, path)
+
+
+def _iter_ndjson(path):
+    with io.TextIOWrapper(_open_binary(path, "r"), encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def _iter_legacy_json(path, key="Emissions"):
+    """
+    Incrementally decode the records of a `{"Emissions": [...]}` document without loading the whole file.
+    """
+    decoder = json.JSONDecoder()
+    with io.TextIOWrapper(_open_binary(path, "r"), encoding="utf-8") as file:
+        buffer = ""
+        eof = False
+
+        def refill(buffer, position):
+            chunk = file.read(_READ_CHUNK_SIZE)
+            return buffer[position:] + chunk, 0, chunk == ""
+
+        # Move to the opening bracket of the records array
+        position = 0
+        while True:
+            start = buffer.find(f'"{key}"')
+            bracket = buffer.find("[", start) if start != -1 else -1
+            if bracket != -1:
+                position = bracket + 1
+                break
+            if eof:
+                raise ValueError(f"{path} has no '{key}' array")
+            buffer, position, eof = refill(buffer, 0)
+
+        while True:
+            # Skip separators between records
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position >= len(buffer):
+                if eof:
+                    raise ValueError(f"{path} ended before the '{key}' array was closed")
+                buffer, position, eof = refill(buffer, position)
+                continue
+            if buffer[position] == "]":
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                buffer, position, eof = refill(buffer, position)
+                continue
+            yield record
+            position = end
+
+
+def iter_emissions(path):
+    """
+    Stream the emissions records stored in `path`, whichever format it was written in.
+    """
+    if _is_ndjson(path):
+        return _iter_ndjson(path)
+    if path.endswith(".csv"):
+        return _iter_csv(path)
+    return _iter_legacy_json(path)
+
+
+def _iter_csv(path):
+    with open(path, mode='r', newline='') as file:
+        yield from csv.DictReader(file)
+
+
+def resolve_emissions_path(directory, stem):
+    """
+    Return the path of the `stem` dataset in `directory`, preferring the compressed NDJSON form over the legacy JSON file.
+    """
+    for suffix in (DEFAULT_SUFFIX, ".ndjson.zst", ".ndjson", LEGACY_SUFFIX):
+        path = os.path.join(directory, stem + suffix)
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"No emissions data named {stem} found in {directory}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 3:
+        print("Usage: python emissions_io.py <input_file> <output_file>")
+        print("Converts between emissions_data.json and the streamed formats (.ndjson, .ndjson.gz, .ndjson.zst).")
+        sys.exit(1)
+
+    with open_emissions_writer(sys.argv[2]) as writer:
+        writer.write_many(iter_emissions(sys.argv[1]))
+    print(f"Wrote {writer.count} records to {sys.argv[2]}")
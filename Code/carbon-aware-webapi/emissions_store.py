@@ -0,0 +1,193 @@
+import json
+import os
+from array import array
+from collections import namedtuple
+from datetime import datetime, timezone
+
+import numpy as np
+
+from emissions_io import iter_emissions
+
+# Columnar, memory-mappable copy of the harvested emissions data:
+#   meta.json     location names, row range of every location, duration
+#   location.npy  uint16 location code of every row
+#   time.npy      int64 epoch seconds of every row
+#   rating.npy    float32 rating of every row
+#   duration.npy  int32 duration in seconds, only written when the duration is not the same for every row
+# Rows are sorted by (location, time), so a location is one contiguous block and a time range inside it
+# is found with a binary search.
+STORE_VERSION = 1
+
+EmissionsSlice = namedtuple("EmissionsSlice", ["location", "time", "rating", "duration"])
+
+
+def parse_duration(duration):
+    # Durations are returned by the API as "HH:MM:SS"
+    hours, minutes, seconds = map(int, duration.split(':'))
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def format_duration(seconds):
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def to_epoch(value):
+    """
+    Convert a datetime, an ISO 8601 string or epoch seconds to epoch seconds. Naive values are taken as UTC.
+    """
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def format_time(epoch_seconds):
+    # Same format as the API: 2022-05-07T00:00:00+00:00
+    return datetime.fromtimestamp(int(epoch_seconds), timezone.utc).isoformat()
+
+
+def convert(source_path, store_dir):
+    """
+    Convert harvested data in any format read by emissions_io into a columnar store in `store_dir`.
+    """
+    codes = {}
+    location_column = array('H')
+    time_column = array('q')
+    rating_column = array('f')
+    duration_column = array('i')
+
+    for record in iter_emissions(source_path):
+        code = codes.setdefault(record['location'], len(codes))
+        location_column.append(code)
+        time_column.append(to_epoch(record['time']))
+        rating_column.append(float(record['rating']))
+        duration_column.append(parse_duration(record['duration']))
+
+    locations = np.frombuffer(location_column, dtype=np.uint16)
+    times = np.frombuffer(time_column, dtype=np.int64)
+    ratings = np.frombuffer(rating_column, dtype=np.float32)
+    durations = np.frombuffer(duration_column, dtype=np.int32)
+
+    # Give codes in alphabetical order of the location names, then sort the rows by (location, time)
+    names = sorted(codes)
+    remap = np.empty(max(len(codes), 1), dtype=np.uint16)
+    for new_code, name in enumerate(names):
+        remap[codes[name]] = new_code
+    locations = remap[locations] if len(locations) else locations
+    order = np.lexsort((times, locations))
+
+    os.makedirs(store_dir, exist_ok=True)
+    np.save(os.path.join(store_dir, "location.npy"), locations[order])
+    np.save(os.path.join(store_dir, "time.npy"), times[order])
+    np.save(os.path.join(store_dir, "rating.npy"), ratings[order])
+
+    constant_duration = len(durations) > 0 and bool((durations == durations[0]).all())
+    duration_path = os.path.join(store_dir, "duration.npy")
+    if constant_duration:
+        if os.path.exists(duration_path):
+            os.remove(duration_path)
+    else:
+        np.save(duration_path, durations[order])
+
+    bounds = np.searchsorted(locations[order], np.arange(len(names) + 1))
+    meta = {
+        "version": STORE_VERSION,
+        "count": int(len(order)),
+        "locations": names,
+        "offsets": {name: [int(bounds[code]), int(bounds[code + 1])] for code, name in enumerate(names)},
+        "duration": format_duration(int(durations[0])) if constant_duration else None
+    }
+    with open(os.path.join(store_dir, "meta.json"), 'w') as file:
+        json.dump(meta, file, indent=4)
+    return meta
+
+
+class EmissionsStore:
+    """
+    Read-only view of a store written by `convert`. Columns are memory-mapped, so opening a store does
+    not read the data and slices are views on the mapped files, not copies.
+    """
+
+    def __init__(self, store_dir, mmap=True):
+        with open(os.path.join(store_dir, "meta.json"), 'r') as file:
+            meta = json.load(file)
+        if meta.get("version") != STORE_VERSION:
+            raise ValueError(f"Unsupported emissions store version {meta.get('version')} in {store_dir}")
+
+        mmap_mode = 'r' if mmap else None
+        self.locations = meta["locations"]
+        self.offsets = {name: tuple(bounds) for name, bounds in meta["offsets"].items()}
+        self.location = np.load(os.path.join(store_dir, "location.npy"), mmap_mode=mmap_mode)
+        self.time = np.load(os.path.join(store_dir, "time.npy"), mmap_mode=mmap_mode)
+        self.rating = np.load(os.path.join(store_dir, "rating.npy"), mmap_mode=mmap_mode)
+
+        self.duration_seconds = None
+        self.durations = None
+        if meta["duration"] is not None:
+            self.duration = meta["duration"]
+            self.duration_seconds = parse_duration(meta["duration"])
+        else:
+            self.duration = None
+            self.durations = np.load(os.path.join(store_dir, "duration.npy"), mmap_mode=mmap_mode)
+
+    def __len__(self):
+        return len(self.time)
+
+    def __contains__(self, location):
+        return location in self.offsets
+
+    def location_code(self, location):
+        return self.locations.index(location)
+
+    def rows(self, location, start=None, end=None):
+        """
+        Return the (first, last + 1) row range of `location` with `start <= time < end`.
+        Either bound can be a datetime, an ISO 8601 string or epoch seconds, or None for no bound.
+        """
+        if location not in self.offsets:
+            return 0, 0
+        low, high = self.offsets[location]
+        times = self.time[low:high]
+        first = low + (int(np.searchsorted(times, to_epoch(start), 'left')) if start is not None else 0)
+        last = low + (int(np.searchsorted(times, to_epoch(end), 'left')) if end is not None else len(times))
+        return first, max(first, last)
+
+    def slice(self, location, start=None, end=None):
+        """
+        Return the rows of `location` with `start <= time < end` as views on the mapped columns.
+        `duration` is the constant duration in seconds, or a view on the duration column when it varies.
+        """
+        first, last = self.rows(location, start, end)
+        durations = self.duration_seconds if self.durations is None else self.durations[first:last]
+        return EmissionsSlice(location, self.time[first:last], self.rating[first:last], durations)
+
+    def records(self, location, start=None, end=None):
+        """
+        Return the rows of `location` with `start <= time < end` as API style records.
+        """
+        first, last = self.rows(location, start, end)
+        return [self.record(row) for row in range(first, last)]
+
+    def record(self, row):
+        duration = self.duration if self.durations is None else format_duration(int(self.durations[row]))
+        return {
+            "location": self.locations[int(self.location[row])],
+            "time": format_time(self.time[row]),
+            # float32 keeps ~7 significant digits, str() gives the shortest repr of that value
+            "rating": float(str(self.rating[row])),
+            "duration": duration
+        }
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 3:
+        print("Usage: python emissions_store.py <emissions_data file> <store_dir>")
+        sys.exit(1)
+
+    meta = convert(sys.argv[1], sys.argv[2])
+    print(f"Stored {meta['count']} records for {len(meta['locations'])} locations in {sys.argv[2]}")
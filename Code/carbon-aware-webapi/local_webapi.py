@@ -0,0 +1,157 @@
+import argparse
+import json
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from emissions_store import EmissionsStore, convert, format_duration, format_time, to_epoch
+
+# Offline stand-in for the emissions routes of the Carbon Aware WebApi, answered from harvested data.
+# Like the WebApi, a query for the [time, toTime) window returns the data points whose time is in
+# [time - 1h, toTime - 1h). These are the reference windows of the WebApi tests for hourly data:
+# [time - 1h, toTime - 2h] for whole days (test_emission_success_fixdate, test_best_success_fixdate)
+# and [time - 1h, toTime - 1h] for times (test_emission_success_fixtime).
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 5073
+API_OFFSET_SECONDS = 3600
+
+
+class QueryError(ValueError):
+    """
+    Raised for requests the WebApi would answer with 400 Bad Request.
+    """
+
+
+def open_store(data_path):
+    """
+    Open `data_path` as an emissions store. A harvested data file (.ndjson.gz, .ndjson, .json) is converted
+    into `<data_path>.store` the first time, and again whenever the file is newer than the store.
+    """
+    if os.path.isdir(data_path):
+        return EmissionsStore(data_path)
+    store_dir = data_path + ".store"
+    meta_path = os.path.join(store_dir, "meta.json")
+    if not os.path.exists(meta_path) or os.path.getmtime(meta_path) < os.path.getmtime(data_path):
+        print(f"Converting {data_path} into {store_dir}...")
+        convert(data_path, store_dir)
+    return EmissionsStore(store_dir)
+
+
+class EmissionsService:
+    """
+    Answers the /emissions/bylocation(s) queries from an EmissionsStore.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def _rows(self, location, start, end):
+        if location not in self.store:
+            raise QueryError(f"Unknown location: '{location}' not found")
+        first, last = self.store.rows(location, start - API_OFFSET_SECONDS, end - API_OFFSET_SECONDS)
+        return np.arange(first, last)
+
+    def _record(self, row):
+        store = self.store
+        return {
+            "location": store.locations[int(store.location[row])],
+            "time": format_time(store.time[row]),
+            "rating": float(str(store.rating[row])),
+            "duration": store.duration if store.durations is None else format_duration(int(store.durations[row]))
+        }
+
+    def emissions(self, locations, start, end):
+        return [self._record(row) for location in locations for row in self._rows(location, start, end)]
+
+    def best(self, locations, start, end):
+        rows = np.concatenate([self._rows(location, start, end) for location in locations]).astype(np.int64)
+        if not len(rows):
+            return []
+        ratings = self.store.rating[rows]
+        return [self._record(row) for row in rows[ratings == ratings.min()]]
+
+
+def parse_query(query):
+    """
+    Extract the locations and the [time, toTime) window in epoch seconds from a parsed query string.
+    """
+    locations = query.get("location", [])
+    if not locations:
+        raise QueryError("At least one location must be provided")
+    if "time" not in query or "toTime" not in query:
+        raise QueryError("Both time and toTime must be provided")
+    try:
+        start, end = to_epoch(query["time"][0]), to_epoch(query["toTime"][0])
+    except ValueError as error:
+        raise QueryError(str(error))
+    if start >= end:
+        raise QueryError("time must be before toTime")
+    return list(dict.fromkeys(locations)), start, end
+
+
+class EmissionsRequestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections alive between requests of the same client; headers and body are
+    # buffered into one write and sent without Nagle delays, otherwise every response waits ~40ms for an ACK
+    protocol_version = "HTTP/1.1"
+    wbufsize = -1
+    disable_nagle_algorithm = True
+    service = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        routes = {
+            "/emissions/bylocation": self.service.emissions,
+            "/emissions/bylocations": self.service.emissions,
+            "/emissions/bylocations/best": self.service.best,
+        }
+        handler = routes.get(url.path.rstrip("/"))
+        if handler is None:
+            return self.send_json(404, {"title": "Not Found", "detail": f"Unknown route {url.path}"})
+        try:
+            locations, start, end = parse_query(parse_qs(url.query))
+            return self.send_json(200, handler(locations, start, end))
+        except QueryError as error:
+            return self.send_json(400, {"title": "Bad Request", "detail": str(error)})
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def make_server(store, host=DEFAULT_HOST, port=DEFAULT_PORT, verbose=False):
+    """
+    Create (but do not start) a threaded server answering from `store`. Use port 0 for any free port.
+    """
+    handler = type("Handler", (EmissionsRequestHandler,), {"service": EmissionsService(store)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.verbose = verbose
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the Carbon Aware WebApi emissions routes from harvested data.")
+    parser.add_argument("data", help="emissions store directory or harvested data file (.ndjson.gz, .ndjson, .json)")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    server = make_server(open_store(args.data), args.host, args.port, args.verbose)
+    print(f"Serving emissions data from {args.data} on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,149 @@
+from collections import namedtuple
+from datetime import datetime, timezone
+
+import numpy as np
+
+from emissions_io import iter_emissions
+from emissions_store import EmissionsStore, format_duration, parse_duration, to_epoch
+
+# Result of RatingIndex.lookup_batch, one entry per query. Queries without a matching interval have
+# found=False, rating=nan, duration=0 and start=end=-1.
+BatchResult = namedtuple("BatchResult", ["found", "rating", "duration", "start", "end"])
+
+
+class _LocationIndex:
+    """
+    Intervals of a single location, sorted by start time.
+    `raw` keeps the original (time, rating, duration) values of the rows so lookups can return them unchanged.
+    """
+
+    def __init__(self, starts, durations, ratings, raw=None):
+        order = np.argsort(starts, kind='stable')
+        self.starts = np.asarray(starts, dtype=np.int64)[order]
+        self.durations = np.asarray(durations, dtype=np.int64)[order]
+        self.ends = self.starts + self.durations
+        self.ratings = np.asarray(ratings, dtype=np.float64)[order]
+        self.raw = [raw[i] for i in order] if raw is not None else None
+
+    def find(self, times):
+        """
+        Return the row of the interval containing each of `times`, or -1 when no interval contains it.
+        """
+        rows = np.searchsorted(self.starts, times, 'right') - 1
+        hit = rows >= 0
+        hit[hit] = times[hit] < self.ends[rows[hit]]
+        return np.where(hit, rows, -1)
+
+
+def _to_epoch_array(times):
+    times = np.asarray(times).ravel()
+    if np.issubdtype(times.dtype, np.datetime64):
+        return times.astype('datetime64[s]').astype(np.int64)
+    if np.issubdtype(times.dtype, np.integer):
+        return times.astype(np.int64)
+    return np.fromiter((to_epoch(time) for time in times), dtype=np.int64, count=times.size)
+
+
+class RatingIndex:
+    """
+    Per-location interval index over emissions data, built once and queried by binary search.
+
+    `lookup` answers a single (location, time) query, `lookup_batch` answers arrays of queries in one call.
+    Naive times are taken as UTC.
+    """
+
+    def __init__(self, by_location):
+        self._by_location = by_location
+
+    @classmethod
+    def from_records(cls, records):
+        columns = {}
+        for record in records:
+            starts, durations, ratings, raw = columns.setdefault(record['location'], ([], [], [], []))
+            starts.append(to_epoch(record['time']))
+            durations.append(parse_duration(record['duration']))
+            ratings.append(float(record['rating']))
+            raw.append((record['time'], record['rating'], record['duration']))
+        return cls({location: _LocationIndex(*values) for location, values in columns.items()})
+
+    @classmethod
+    def from_file(cls, file_path):
+        """
+        Build the index from a CSV or any harvested emissions format (.ndjson.gz, .ndjson, .json).
+        """
+        return cls.from_records(iter_emissions(file_path))
+
+    @classmethod
+    def from_store(cls, store):
+        """
+        Build the index from an emissions_store.EmissionsStore (or the path to one).
+        """
+        if isinstance(store, str):
+            store = EmissionsStore(store)
+        by_location = {}
+        for location in store.locations:
+            rows = store.slice(location)
+            durations = np.broadcast_to(rows.duration, rows.time.shape)
+            # Go through the shortest repr of the float32 ratings so 250.123 stays 250.123 as a float64
+            by_location[location] = _LocationIndex(rows.time, durations, rows.rating.astype(str).astype(np.float64))
+        return cls(by_location)
+
+    @property
+    def locations(self):
+        return list(self._by_location)
+
+    def lookup(self, location, time):
+        """
+        Find the interval of `location` containing `time`.
+        :return: (rating, duration, time period, location), or four Nones when there is no such interval.
+        """
+        index = self._by_location.get(location)
+        if index is None:
+            return None, None, None, None
+        row = int(index.find(np.array([to_epoch(time)]))[0])
+        if row < 0:
+            return None, None, None, None
+
+        end = datetime.fromtimestamp(int(index.ends[row]), timezone.utc).replace(tzinfo=None).isoformat()
+        if index.raw is not None:
+            start, rating, duration = index.raw[row]
+        else:
+            start = datetime.fromtimestamp(int(index.starts[row]), timezone.utc).isoformat()
+            rating, duration = float(index.ratings[row]), format_duration(int(index.durations[row]))
+        return rating, duration, f"{start} to {end}", location
+
+    def lookup_batch(self, locations, times):
+        """
+        Vectorised lookup of many (location, time) queries.
+        :param locations: 1-D array-like of location names.
+        :param times: 1-D array-like of datetimes, ISO 8601 strings, numpy datetime64 or epoch seconds.
+        :return: BatchResult of numpy arrays: found, rating, duration (seconds) and interval start/end (epoch seconds).
+        """
+        locations = np.asarray(locations).ravel()
+        times = _to_epoch_array(times).ravel()
+        if locations.shape != times.shape:
+            raise ValueError(f"locations and times must have the same shape, got {locations.shape} and {times.shape}")
+
+        found = np.zeros(times.shape, dtype=bool)
+        rating = np.full(times.shape, np.nan)
+        duration = np.zeros(times.shape, dtype=np.int64)
+        start = np.full(times.shape, -1, dtype=np.int64)
+        end = np.full(times.shape, -1, dtype=np.int64)
+
+        # One binary search per distinct location over all of its queries
+        names, inverse = np.unique(locations, return_inverse=True)
+        for code, name in enumerate(names):
+            index = self._by_location.get(str(name))
+            if index is None:
+                continue
+            queries = inverse == code
+            rows = index.find(times[queries])
+            hit = rows >= 0
+            targets = np.flatnonzero(queries)[hit]
+            found[targets] = True
+            rating[targets] = index.ratings[rows[hit]]
+            duration[targets] = index.durations[rows[hit]]
+            start[targets] = index.starts[rows[hit]]
+            end[targets] = index.ends[rows[hit]]
+
+        return BatchResult(found, rating, duration, start, end)
@@ -0,0 +1,259 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timezone
+from urllib.parse import quote, urlsplit
+
+# Content-addressed on-disk cache of Carbon Aware WebApi responses, shared by every client: the Python tools use this
+# module and the advisor plugin uses src/util/response-cache.ts of if-optimisation-models, which reads and writes the
+# same files. Set CARBON_AWARE_CACHE_DIR (or pass a cache directory) to use it.
+#
+# An entry is <directory>/<sha[:2]>/<sha>.json, where sha is the SHA-256 of the canonical request:
+#   base URL (scheme://host[:port][/path], lower case scheme and host, without default port or trailing slash)
+#   + route (lower case, without trailing slash) + "?" + the query pairs sorted by name (values keep their order),
+#   percent-encoded like JavaScript's encodeURIComponent; time and toTime are rewritten as YYYY-MM-DDTHH:MM:SS.sssZ.
+# The base URL keeps the responses of different servers (the WebApi, local_webapi.py, ...) apart.
+# The file holds {"key", "stored_at", "expires_at", "body"}. Responses for windows that ended more than
+# settle_seconds ago never expire, anything more recent expires after recent_ttl seconds. The modification time of
+# an entry is its last use, and the least recently used entries are removed when the cache grows over max_bytes.
+
+CACHE_DIR_ENV = "CARBON_AWARE_CACHE_DIR"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_RECENT_TTL = 10 * 60
+DEFAULT_SETTLE_SECONDS = 24 * 60 * 60
+TIME_PARAMS = ("time", "toTime")
+
+
+def _parse_time(value):
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    # Times without an offset are UTC, like everywhere else in these tools
+    return parsed.replace(tzinfo=timezone.utc) if parsed.tzinfo is None else parsed
+
+
+def _canonical_time(value):
+    try:
+        parsed = _parse_time(value).astimezone(timezone.utc)
+    except ValueError:
+        return str(value)
+    return parsed.strftime("%Y-%m-%dT%H:%M:%S.") + f"{parsed.microsecond // 1000:03d}Z"
+
+
+def _encode(value):
+    # Same escaping as encodeURIComponent
+    return quote(str(value), safe="-_.!~*'()")
+
+
+def canonical_base_url(base_url):
+    """
+    Normalised form of the server a request is sent to, the same as `new URL(base_url)` gives in JavaScript.
+    """
+    parts = urlsplit(str(base_url))
+    if not parts.scheme or not parts.hostname:
+        return str(base_url).rstrip("/").lower()
+    scheme = parts.scheme.lower()
+    host = f"[{parts.hostname}]" if ":" in parts.hostname else parts.hostname
+    port = parts.port
+    if port is not None and port != {"http": 80, "https": 443}.get(scheme):
+        host += f":{port}"
+    return f"{scheme}://{host}{parts.path.rstrip('/')}"
+
+
+def canonical_request(base_url, route, params=None):
+    """
+    Normalised form of a request; two requests with the same canonical form get the same response.
+    """
+    pairs = []
+    for name in sorted(params or {}):
+        values = params[name]
+        for value in (values if isinstance(values, (list, tuple)) else [values]):
+            pairs.append(f"{_encode(name)}={_encode(_canonical_time(value) if name in TIME_PARAMS else value)}")
+    route = "/" + route.strip("/").lower()
+    return canonical_base_url(base_url) + route + ("?" + "&".join(pairs) if pairs else "")
+
+
+def cache_key(base_url, route, params=None):
+    return hashlib.sha256(canonical_request(base_url, route, params).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    On-disk cache of WebApi responses. `get` returns the cached body of a request to `base_url` or None, `put` stores a body.
+    Counters of the hits, misses, stores, expired entries and evictions of this instance are in `stats()`,
+    the number of entries and the size of the whole directory in `usage()`.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, recent_ttl=DEFAULT_RECENT_TTL,
+                 settle_seconds=DEFAULT_SETTLE_SECONDS, clock=time.time):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.recent_ttl = recent_ttl
+        self.settle_seconds = settle_seconds
+        self.clock = clock
+        self._size = None
+        self.counters = {"hits": 0, "misses": 0, "stores": 0, "expired": 0, "evictions": 0}
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def expires_at(self, params):
+        """
+        None when the requested window is settled (ended more than settle_seconds ago), otherwise now + recent_ttl.
+        """
+        to_time = (params or {}).get("toTime")
+        if isinstance(to_time, (list, tuple)):
+            to_time = to_time[0] if to_time else None
+        now = self.clock()
+        if to_time is not None:
+            try:
+                if _parse_time(to_time).timestamp() <= now - self.settle_seconds:
+                    return None
+            except ValueError:
+                pass
+        return now + self.recent_ttl
+
+    def get(self, base_url, route, params=None):
+        path = self._path(cache_key(base_url, route, params))
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                entry = json.load(file)
+        except (FileNotFoundError, ValueError):
+            self.counters["misses"] += 1
+            return None
+        if entry.get("expires_at") is not None and entry["expires_at"] <= self.clock():
+            self.counters["expired"] += 1
+            self.counters["misses"] += 1
+            self._remove(path)
+            return None
+        try:
+            # Mark the entry as recently used for the LRU eviction
+            os.utime(path)
+        except OSError:
+            pass
+        self.counters["hits"] += 1
+        return entry["body"]
+
+    def put(self, base_url, route, params, body):
+        key = cache_key(base_url, route, params)
+        path = self._path(key)
+        entry = {
+            "key": canonical_request(base_url, route, params),
+            "stored_at": self.clock(),
+            "expires_at": self.expires_at(params),
+            "body": body,
+        }
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps(entry).encode("utf-8")
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(data)
+        try:
+            # An entry that is overwritten no longer counts towards the size
+            replaced_size = os.path.getsize(path)
+        except FileNotFoundError:
+            replaced_size = 0
+        os.replace(temp_path, path)
+        self.counters["stores"] += 1
+        if self._size is not None:
+            self._size += len(data) - replaced_size
+        if self.size() > self.max_bytes:
+            self.evict()
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield stat.st_mtime, stat.st_size, path
+
+    def _remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        if self._size is not None:
+            self._size -= size
+
+    def size(self):
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._entries())
+        return self._size
+
+    def evict(self, target_bytes=None):
+        """
+        Remove the least recently used entries until the cache is at most `target_bytes` (default 90% of max_bytes).
+        """
+        target_bytes = int(self.max_bytes * 0.9) if target_bytes is None else target_bytes
+        entries = sorted(self._entries())
+        self._size = sum(size for _, size, _ in entries)
+        for _, _, path in entries:
+            if self._size <= target_bytes:
+                break
+            self._remove(path)
+            self.counters["evictions"] += 1
+
+    def clear(self):
+        for _, _, path in list(self._entries()):
+            self._remove(path)
+        self._size = 0
+
+    def stats(self):
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return dict(self.counters, hit_rate=self.counters["hits"] / lookups if lookups else None, bytes=self.size())
+
+    def usage(self):
+        """
+        Number of entries and size in bytes of the cache directory, whichever processes wrote it.
+        """
+        entries = list(self._entries())
+        self._size = sum(size for _, size, _ in entries)
+        return {"entries": len(entries), "bytes": self._size}
+
+
+def default_cache():
+    """
+    The cache in $CARBON_AWARE_CACHE_DIR, or None when it is not set.
+    """
+    directory = os.environ.get(CACHE_DIR_ENV)
+    return ResponseCache(directory) if directory else None
+
+
+def cached_get(session, url, route, params=None, cache=None, **kwargs):
+    """
+    GET `url + route` through `session` (or the requests module) and return the decoded JSON body,
+    answering from `cache` when it has the response. Only successful responses are stored.
+    """
+    if cache is not None:
+        body = cache.get(url, route, params)
+        if body is not None:
+            return body
+    response = session.get(url + route, params=params, **kwargs)
+    response.raise_for_status()
+    body = response.json()
+    if cache is not None:
+        cache.put(url, route, params, body)
+    return body
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or clear the WebApi response cache.")
+    parser.add_argument("directory", nargs="?", default=os.environ.get(CACHE_DIR_ENV), help=f"cache directory (default: ${CACHE_DIR_ENV})")
+    parser.add_argument("--clear", action="store_true", help="remove every entry")
+    parser.add_argument("--max-bytes", type=int, help="evict least recently used entries down to this size")
+    args = parser.parse_args()
+    if not args.directory:
+        parser.error(f"no cache directory given and {CACHE_DIR_ENV} is not set")
+
+    cache = ResponseCache(args.directory)
+    if args.clear:
+        cache.clear()
+    elif args.max_bytes is not None:
+        cache.max_bytes = args.max_bytes
+        cache.evict(args.max_bytes)
+    print(json.dumps(cache.usage(), indent=4))
@@ -0,0 +1,89 @@
+import os
+import sys
+from datetime import timezone
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from emissions_io import iter_emissions
+
+# Format of the times in the reference data, e.g. 2022-05-07T00:00:00+00:00
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
+
+
+def _epoch(value):
+    # Naive datetimes are UTC, like the times of the reference data
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+class EmissionsOracle:
+    """
+    Reference answers for the WebApi tests, computed from the harvested emissions data.
+
+    The data is parsed once: times become int64 epoch seconds and the rows are grouped by location,
+    so every query is a vectorised mask over the rows of the requested locations only.
+    Records are returned in the order of the reference file, as copies that callers may modify.
+    """
+
+    def __init__(self, records):
+        self.records = records
+        frame = pd.DataFrame({
+            "location": [record['location'] for record in records],
+            "time": pd.to_datetime([record['time'] for record in records], format=TIME_FORMAT, utc=True),
+            "rating": np.array([record['rating'] for record in records], dtype=np.float64),
+        })
+        self._times = ((frame["time"] - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64)
+        self._ratings = frame["rating"].to_numpy()
+        # Row numbers of every location, in file order
+        self._rows = {location: np.asarray(rows) for location, rows in frame.groupby("location", sort=False).indices.items()}
+
+    def _window_rows(self, location, start, end):
+        rows = self._rows.get(location)
+        if rows is None:
+            return np.empty(0, dtype=np.int64)
+        times = self._times[rows]
+        return rows[(times >= _epoch(start)) & (times <= _epoch(end))]
+
+    def _to_records(self, rows):
+        return [dict(self.records[row]) for row in rows]
+
+    def window(self, locations, start, end):
+        """
+        All records of `locations` with `start <= time <= end`, in file order.
+        """
+        rows = [self._window_rows(location, start, end) for location in dict.fromkeys(locations)]
+        return self._to_records(np.sort(np.concatenate(rows)) if rows else [])
+
+    def lowest_per_location(self, locations, start, end):
+        """
+        For each location in turn, the records with its lowest rating in `start <= time <= end`.
+        """
+        result = []
+        for location in locations:
+            rows = self._window_rows(location, start, end)
+            if len(rows):
+                ratings = self._ratings[rows]
+                result.extend(self._to_records(rows[ratings == ratings.min()]))
+        return result
+
+    def lowest_across_locations(self, locations, start, end):
+        """
+        The records with the lowest rating over all `locations` in `start <= time <= end`.
+        """
+        lowest = self.lowest_per_location(locations, start, end)
+        if not lowest:
+            return []
+        lowest_rating = min(entry['rating'] for entry in lowest)
+        return [entry for entry in lowest if entry['rating'] == lowest_rating]
+
+
+@lru_cache(maxsize=None)
+def load_oracle(emissions_file_path):
+    """
+    Parse `emissions_file_path` once per process, so every test class reuses the same oracle.
+    """
+    return EmissionsOracle(list(iter_emissions(emissions_file_path)))
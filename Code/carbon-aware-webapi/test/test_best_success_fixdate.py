@@ -2,21 +2,27 @@ import requests
 import unittest
 import json
 import os
+import sys
 import time
 import itertools
 import random
 from datetime import datetime, timedelta
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from emissions_io import resolve_emissions_path
+from emissions_oracle import load_oracle
+
 class TestEmissionsAPI(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
         super(TestEmissionsAPI, cls).setUpClass()
         
         # Load emissions reference data
-        emissions_file_path = os.path.join(os.path.dirname(__file__), '..', 'emissions_data_core_locations.json')
-        # emissions_file_path = os.path.join(os.path.dirname(__file__), '..', 'emissions_data.json')
-        with open(emissions_file_path, 'r') as emissions_file:
-            cls.reference_data = json.load(emissions_file)['Emissions']
+        # Records are streamed from emissions_data_core_locations.ndjson.gz, or from the legacy .json document
+        emissions_file_path = resolve_emissions_path(os.path.join(os.path.dirname(__file__), '..'), 'emissions_data_core_locations')
+        # emissions_file_path = resolve_emissions_path(os.path.join(os.path.dirname(__file__), '..'), 'emissions_data')
+        # Parsed once per process and shared by every test class
+        cls.oracle = load_oracle(emissions_file_path)
         
         locations_file_path = os.path.join(os.path.dirname(__file__), '..', 'locations_test.json')
         # locations_file_path = os.path.join(os.path.dirname(__file__), '..', 'locations.json')
@@ -57,8 +63,7 @@ class TestEmissionsAPI(unittest.TestCase):
         except ValueError:
             return datetime.strptime(date_str + "T00:00:00+00:00", full_format)
     
-    def find_reference_data(self, locations, time, toTime):
-        format_str = "%Y-%m-%dT%H:%M:%S+00:00"
+    def search_window(self, time, toTime):
         start_time = self.parse_datetime(time)
         end_time = self.parse_datetime(toTime)
 
@@ -66,44 +71,16 @@ class TestEmissionsAPI(unittest.TestCase):
         search_end_time = end_time - timedelta(hours=2)
         # search_start_time = start_time
         # search_end_time = end_time + timedelta(hours=1)
+        return search_start_time, search_end_time
 
-        # print(f"Start time: {start_time}")
-        # print(f"End time: {end_time}")
-        # print(f"Search start time: {search_start_time}")
-        # print(f"Search end time: {search_end_time}")
-
-        # filtered_data = []
-        # for entry in self.reference_data:
-        #     entry_time = datetime.strptime(entry['time'], format_str)
-        #     if entry['location'] in locations and search_start_time <= entry_time <= search_end_time:
-        #         # print(f"Entry time: {entry_time}")
-        #         filtered_data.append(entry)
-
-        lowest_ratings_per_location = []
-        for location in locations:
-            location_filtered_data = [entry for entry in self.reference_data if entry['location'] == location and search_start_time <= datetime.strptime(entry['time'], format_str) <= search_end_time]
-            if location_filtered_data:
-                sorted_data = sorted(location_filtered_data, key=lambda x: x['rating'])
-                min_rating = sorted_data[0]['rating']
-                lowest_ratings_per_location.extend([entry for entry in sorted_data if entry['rating'] == min_rating])
-
-        return lowest_ratings_per_location
+    def find_reference_data(self, locations, time, toTime):
+        # For each location, the entries with its lowest rating inside the search window
+        return self.oracle.lowest_per_location(locations, *self.search_window(time, toTime))
 
 
     def find_lowest_rating_across_locations(self, locations, time, toTime):
-        all_lowest_ratings = self.find_reference_data(locations, time, toTime)
-
-        # If there are no entries, return an empty list
-        if not all_lowest_ratings:
-            return []
-
-        # Find the entry with the absolute lowest rating across all locations
-        lowest_rating_value = min(entry['rating'] for entry in all_lowest_ratings)
-
-        # Find all entries with this lowest rating value
-        lowest_rating_entries = [entry for entry in all_lowest_ratings if entry['rating'] == lowest_rating_value]
-
-        return lowest_rating_entries
+        # All entries with the lowest rating over all locations inside the search window, empty if there are none
+        return self.oracle.lowest_across_locations(locations, *self.search_window(time, toTime))
     
 
     def test_emissions_by_single_location_for_all_regions(self):
@@ -2,10 +2,15 @@ import requests
 import unittest
 import json
 import os
+import sys
 import time
 import random
 from datetime import datetime, timedelta
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from emissions_io import resolve_emissions_path
+from emissions_oracle import load_oracle
+
 
 def generate_random_datetime_at_hour_end(start_date, end_date):
     """
@@ -41,10 +46,11 @@ class TestEmissionsAPI(unittest.TestCase):
         super(TestEmissionsAPI, cls).setUpClass()
         
         # Load emissions reference data
-        emissions_file_path = os.path.join(os.path.dirname(__file__), '..', 'emissions_data_core_locations.json')
-        # emissions_file_path = os.path.join(os.path.dirname(__file__), '..', 'emissions_data.json')
-        with open(emissions_file_path, 'r') as emissions_file:
-            cls.reference_data = json.load(emissions_file)['Emissions']
+        # Records are streamed from emissions_data_core_locations.ndjson.gz, or from the legacy .json document
+        emissions_file_path = resolve_emissions_path(os.path.join(os.path.dirname(__file__), '..'), 'emissions_data_core_locations')
+        # emissions_file_path = resolve_emissions_path(os.path.join(os.path.dirname(__file__), '..'), 'emissions_data')
+        # Parsed once per process and shared by every test class
+        cls.oracle = load_oracle(emissions_file_path)
         
         locations_file_path = os.path.join(os.path.dirname(__file__), '..', 'locations_test.json')
         # locations_file_path = os.path.join(os.path.dirname(__file__), '..', 'locations.json')
@@ -70,7 +76,6 @@ class TestEmissionsAPI(unittest.TestCase):
 
     
     def find_reference_data(self, locations, time, toTime):
-        format_str = "%Y-%m-%dT%H:%M:%S+00:00"
         # start_time = self.parse_datetime(time) - timedelta(minutes=30)
         start_time = self.parse_datetime(time)
         # end_time = self.parse_datetime(toTime) - timedelta(minutes=30)
@@ -81,13 +86,8 @@ class TestEmissionsAPI(unittest.TestCase):
         search_end_time = end_time - timedelta(hours=1)
         print(f"Search start time: {search_start_time}")
         print(f"Search end time: {search_end_time}")
-        filtered_data = []
-        for entry in self.reference_data:
-            entry_time = datetime.strptime(entry['time'], format_str)
-            if entry['location'] in locations and search_start_time <= entry_time <= search_end_time:
-                filtered_data.append(entry)
 
-        return filtered_data
+        return self.oracle.window(locations, search_start_time, search_end_time)
         # return [entry for entry in self.reference_data if entry['location'] in locations and entry['time'] >= time and entry['time'] <= toTime]
 
 
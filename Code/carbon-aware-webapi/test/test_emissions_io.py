@@ -0,0 +1,74 @@
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from itertools import islice
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from emissions_io import _READ_CHUNK_SIZE, iter_emissions, open_emissions_writer
+
+
+def make_records(count):
+    return [
+        {"location": "westus", "time": f"2022-05-07T{index // 12 % 24:02d}:{index % 12 * 5:02d}:00+00:00",
+         "rating": 100.0 + index, "duration": "00:05:00"}
+        for index in range(count)
+    ]
+
+
+class TestIterEmissionsStreaming(unittest.TestCase):
+    """
+    The reader must yield records as it decodes them: the first records of a file that is cut off
+    (an interrupted harvest or download) are readable, only reading past the cut fails.
+    """
+
+    # Enough records for the files to span many read chunks
+    RECORD_COUNT = 20000
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.records = make_records(self.RECORD_COUNT)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name):
+        path = os.path.join(self.directory, name)
+        with open_emissions_writer(path) as writer:
+            writer.write_many(self.records)
+        return path
+
+    def truncate(self, path, size):
+        with open(path, 'r+b') as file:
+            file.truncate(size)
+
+    def test_legacy_json_is_read_lazily(self):
+        path = self.write('emissions_data.json')
+        self.assertGreater(os.path.getsize(path), 10 * _READ_CHUNK_SIZE)
+        self.truncate(path, os.path.getsize(path) // 2)
+
+        stream = iter_emissions(path)
+        self.assertEqual(next(stream), self.records[0])
+        self.assertEqual(list(islice(stream, 99)), self.records[1:100])
+        with self.assertRaises(ValueError):
+            list(stream)
+
+    def test_ndjson_gz_is_read_lazily(self):
+        path = self.write('emissions_data.ndjson.gz')
+        self.truncate(path, os.path.getsize(path) // 2)
+
+        stream = iter_emissions(path)
+        self.assertEqual(list(islice(stream, 100)), self.records[:100])
+        with self.assertRaises((EOFError, gzip.BadGzipFile)):
+            list(stream)
+
+    def test_complete_files_round_trip(self):
+        for name in ('emissions_data.json', 'emissions_data.ndjson', 'emissions_data.ndjson.gz'):
+            with self.subTest(name=name):
+                self.assertEqual(list(iter_emissions(self.write(name))), self.records)
+
+
+if __name__ == "__main__":
+    unittest.main()
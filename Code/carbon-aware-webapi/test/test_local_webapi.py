@@ -0,0 +1,111 @@
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from emissions_io import open_emissions_writer
+from emissions_oracle import EmissionsOracle
+from emissions_store import EmissionsStore, convert
+from local_webapi import EmissionsService, make_server
+
+LOCATIONS = ["eastus", "westus", "uksouth"]
+
+
+def make_records(seed=0):
+    # Hourly data points like the harvested data, with few distinct ratings so that the best route has ties
+    generator = random.Random(seed)
+    start = datetime(2022, 5, 5, tzinfo=timezone.utc)
+    return [
+        {"location": location, "time": (start + timedelta(hours=hour)).isoformat(),
+         "rating": float(generator.randint(100, 130)), "duration": "01:00:00"}
+        for location in LOCATIONS
+        for hour in range(6 * 24)
+    ]
+
+
+class TestLocalWebApiWindows(unittest.TestCase):
+    """
+    The stand-in must answer like the WebApi, whose expected answers are the reference windows of
+    test_emission_success_fixdate, test_best_success_fixdate and test_emission_success_fixtime.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        records = make_records()
+        data_path = os.path.join(cls.directory, 'emissions_data.ndjson')
+        with open_emissions_writer(data_path) as writer:
+            writer.write_many(records)
+        convert(data_path, os.path.join(cls.directory, 'store'))
+        cls.service = EmissionsService(EmissionsStore(os.path.join(cls.directory, 'store')))
+        cls.oracle = EmissionsOracle(records)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def query(self, handler, locations, time, toTime):
+        return handler(locations, int(time.timestamp()), int(toTime.timestamp()))
+
+    def test_fixdate_window(self):
+        # time=2022-05-07, toTime=2022-05-08 expects [time - 1h, toTime - 2h]: 2022-05-06T23:00 to 2022-05-07T22:00
+        time = datetime(2022, 5, 7, tzinfo=timezone.utc)
+        toTime = datetime(2022, 5, 8, tzinfo=timezone.utc)
+        for location in LOCATIONS:
+            expected = self.oracle.window([location], time - timedelta(hours=1), toTime - timedelta(hours=2))
+            actual = self.query(self.service.emissions, [location], time, toTime)
+            self.assertEqual(actual, expected)
+            self.assertEqual((actual[0]['time'], actual[-1]['time']), ("2022-05-06T23:00:00+00:00", "2022-05-07T22:00:00+00:00"))
+
+    def test_fixtime_window(self):
+        # time=...T00:00, toTime=...T00:30 expects [time - 1h, toTime - 1h], i.e. the data point of the hour before
+        for hour in (0, 13):
+            time = datetime(2022, 5, 7, hour, tzinfo=timezone.utc)
+            toTime = time + timedelta(minutes=30)
+            for location in LOCATIONS:
+                expected = self.oracle.window([location], time - timedelta(hours=1), toTime - timedelta(hours=1))
+                self.assertEqual(len(expected), 1)
+                self.assertEqual(self.query(self.service.emissions, [location], time, toTime), expected)
+
+    def test_best_window(self):
+        time = datetime(2022, 5, 7, tzinfo=timezone.utc)
+        toTime = datetime(2022, 5, 8, tzinfo=timezone.utc)
+        for size in range(1, len(LOCATIONS) + 1):
+            locations = LOCATIONS[:size]
+            expected = self.oracle.lowest_across_locations(locations, time - timedelta(hours=1), toTime - timedelta(hours=2))
+            self.assertEqual(self.query(self.service.best, locations, time, toTime), expected)
+
+    def test_http_routes(self):
+        # Same windows through the server, with the query formats of the WebApi tests
+        server = make_server(self.service.store, port=0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            base = f"http://{server.server_address[0]}:{server.server_address[1]}"
+
+            def get(route, **params):
+                with urlopen(f"{base}{route}?{urlencode(params, doseq=True)}") as response:
+                    return json.load(response)
+
+            day = datetime(2022, 5, 7, tzinfo=timezone.utc)
+            self.assertEqual(get("/emissions/bylocation", location="westus", time="2022-05-07", toTime="2022-05-08"),
+                             self.oracle.window(["westus"], day - timedelta(hours=1), day + timedelta(hours=22)))
+            self.assertEqual(get("/emissions/bylocation", location="westus", time="2022-05-07T00:00", toTime="2022-05-07T00:30"),
+                             self.oracle.window(["westus"], day - timedelta(hours=1), day - timedelta(minutes=30)))
+            self.assertEqual(get("/emissions/bylocations/best", location=LOCATIONS, time="2022-05-07", toTime="2022-05-08"),
+                             self.oracle.lowest_across_locations(LOCATIONS, day - timedelta(hours=1), day + timedelta(hours=22)))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from response_cache import ResponseCache, canonical_request
+
+
+class TestResponseCache(unittest.TestCase):
+    """
+    The canonical requests must stay byte-identical to canonicalRequest of src/util/response-cache.ts
+    in if-optimisation-models, which reads and writes the same cache files.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_canonical_request(self):
+        self.assertEqual(
+            canonical_request("HTTP://LocalHost:5073/", "/Emissions/ByLocations/",
+                              {"location": ["eastus", "west us"], "time": "2022-05-07", "toTime": "2022-05-08T00:00:00+02:00"}),
+            "http://localhost:5073/emissions/bylocations?location=eastus&location=west%20us"
+            "&time=2022-05-07T00%3A00%3A00.000Z&toTime=2022-05-07T22%3A00%3A00.000Z")
+        self.assertEqual(canonical_request("https://example.com:443/api/", "x"), "https://example.com/api/x")
+        self.assertEqual(canonical_request("http://[::1]:5073", "/x", {"location": "a&b"}), "http://[::1]:5073/x?location=a%26b")
+
+    def test_servers_are_kept_apart(self):
+        cache = ResponseCache(self.directory)
+        params = {"location": ["eastus"], "time": "2022-05-07", "toTime": "2022-05-08"}
+        cache.put("http://localhost:5073", "/emissions/bylocations", params, ["webapi"])
+        cache.put("http://127.0.0.1:8080", "/emissions/bylocations", params, ["stand-in"])
+
+        self.assertEqual(cache.get("http://localhost:5073/", "/emissions/bylocations", params), ["webapi"])
+        self.assertEqual(cache.get("http://127.0.0.1:8080", "/emissions/bylocations", params), ["stand-in"])
+        self.assertIsNone(cache.get("http://example.com", "/emissions/bylocations", params))
+
+    def test_overwritten_entry_size(self):
+        cache = ResponseCache(self.directory)
+        cache.size()
+        for count in (5, 1, 3):
+            cache.put("http://localhost:5073", "/emissions/bylocations", {"location": "eastus"}, list(range(count)))
+        self.assertEqual(cache.size(), ResponseCache(self.directory).usage()["bytes"])
+
+
+if __name__ == "__main__":
+    unittest.main()
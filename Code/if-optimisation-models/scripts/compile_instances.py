@@ -0,0 +1,73 @@
+import argparse
+import hashlib
+import json
+import os
+
+# Compiles the instance catalogs of the right-sizing model (<vendor>-instances.json) into
+# <vendor>-instances.compiled.json, which CPUDatabase.loadCompiled reads without building any intermediate objects:
+#   families        family names, in the order of the catalog
+#   family_offsets  the members of family i are the models family_offsets[i]:family_offsets[i + 1]
+#   models, vcpus, ram  one entry per model, the members of each family sorted by RAM in descending order
+#                       (stable, like the sort of calculateRightSizing)
+#   regions         interned region names
+#   price_offsets   the prices of model i are price_regions/price_values[price_offsets[i]:price_offsets[i + 1]]
+#   source_sha256   SHA-256 of the catalog it was compiled from, a different hash means it is stale
+CATALOG_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'lib', 'right-sizing'))
+VENDORS = ['aws', 'azure']
+COMPILED_VERSION = 2
+
+
+def compile_catalog(catalog):
+    """
+    Build the compiled form of a catalog loaded from JSON ({family: [{model, vCPUs, RAM, Price}]}).
+    """
+    compiled = {
+        'version': COMPILED_VERSION,
+        'families': [], 'family_offsets': [0],
+        'models': [], 'vcpus': [], 'ram': [],
+        'regions': [], 'price_offsets': [0], 'price_regions': [], 'price_values': []
+    }
+    region_codes = {}
+    for family, members in catalog.items():
+        compiled['families'].append(family)
+        for member in sorted(members, key=lambda member: -member['RAM']):
+            compiled['models'].append(member['model'])
+            compiled['vcpus'].append(member['vCPUs'])
+            compiled['ram'].append(member['RAM'])
+            for region, price in (member.get('Price') or {}).items():
+                if region not in region_codes:
+                    region_codes[region] = len(compiled['regions'])
+                    compiled['regions'].append(region)
+                compiled['price_regions'].append(region_codes[region])
+                compiled['price_values'].append(price)
+            compiled['price_offsets'].append(len(compiled['price_values']))
+        compiled['family_offsets'].append(len(compiled['models']))
+    return compiled
+
+
+def compile_file(source_path, target_path):
+    with open(source_path, 'rb') as file:
+        source = file.read()
+    compiled = compile_catalog(json.loads(source))
+    compiled['source_sha256'] = hashlib.sha256(source).hexdigest()
+    with open(target_path, 'w') as file:
+        json.dump(compiled, file, separators=(',', ':'))
+    return compiled
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile the right-sizing instance catalogs')
+    parser.add_argument('vendors', nargs='*', default=VENDORS, help='vendors to compile (default: all)')
+    parser.add_argument('--dir', default=CATALOG_DIR, help='directory of the <vendor>-instances.json catalogs')
+    args = parser.parse_args()
+
+    for vendor in args.vendors:
+        source_path = os.path.join(args.dir, f'{vendor}-instances.json')
+        target_path = os.path.join(args.dir, f'{vendor}-instances.compiled.json')
+        compiled = compile_file(source_path, target_path)
+        print(f"{target_path}: {len(compiled['families'])} families, {len(compiled['models'])} models, "
+              f"{len(compiled['regions'])} regions, {os.path.getsize(target_path)} bytes")
+
+
+if __name__ == '__main__':
+    main()
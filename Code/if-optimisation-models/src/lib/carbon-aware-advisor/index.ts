@@ -3,11 +3,17 @@ import { PluginInterface } from '../../interfaces';
 import { ConfigParams, PluginParams } from '../../types/common';
 import { buildErrorMessage } from '../../util/helpers';
 import { ERRORS } from '../../util/errors';
+import { ResponseCache } from '../../util/response-cache';
+import { HttpTransport } from '../../util/http-transport';
+import { createLimiter, Limiter } from '../../util/concurrency';
+import { loadStaticData } from '../../util/static-data';
+import { MinRatingReducer } from './reducers';
+import { LocalEmissionsSource } from './local-emissions';
+import { RandomGenerator, sampleWithoutReplacement, seededRandom } from './sampling';
 import { promises as fsPromises } from 'fs';
 import * as path from 'path';
 
 
-// Make sure you have the 'qs' library installed
 export const CarbonAwareAdvisor = (params: ConfigParams): PluginInterface => {
   const { InputValidationError } = ERRORS; //used for exceptions
 
@@ -18,6 +24,12 @@ export const CarbonAwareAdvisor = (params: ConfigParams): PluginInterface => {
     duration: string;
   }
 
+
+  interface TimeframeData { //the data of one timeframe and how many years in the past it was found
+    response: EmissionsData[];
+    numOfYears: number;
+  }
+
   const metadata = {  //necessary metadata returrned by the new version of the impact engine interface
     kind: 'execute'
   };
@@ -27,6 +39,29 @@ export const CarbonAwareAdvisor = (params: ConfigParams): PluginInterface => {
    */
   const API_URL = "http://localhost:5073";
 
+  /**
+   * Optional on-disk cache of API responses, shared with the Python tools.
+   * Enabled by the 'cache-dir' config parameter or the CARBON_AWARE_CACHE_DIR environment variable.
+   */
+  const responseCache = ResponseCache.fromConfig(params?.['cache-dir']);
+
+  /**
+   * Optional local emissions dataset (the 'data-path' config parameter) that answers the queries in-process instead of the API.
+   * It is loaded and indexed once, on the first query.
+   */
+  let dataPath: string | undefined = undefined;
+  let localEmissions: Promise<LocalEmissionsSource> | undefined = undefined;
+
+  /**
+   * Pooled keep-alive connections to the API with timeouts and retries with backoff.
+   * Created on the first request, after the request-timeout-ms and max-retries parameters are validated.
+   */
+  let httpTransport: HttpTransport | undefined = undefined;
+  //timeout of one attempt of a request in milliseconds, set with the request-timeout-ms parameter
+  let requestTimeoutMs: number = 30 * 1000;
+  //how many times a request that failed with 429, 5xx or a network error is retried, set with the max-retries parameter
+  let maxRetries: number = 3;
+
   /**
    * Allowed location parameter that is passed in the config of the model.
    * The arguments are stored in a set to avoid duplicates.
@@ -55,10 +90,27 @@ export const CarbonAwareAdvisor = (params: ConfigParams): PluginInterface => {
   //flag to check if the model has sampling, the sampling value is originally set to 0
   let hasSampling: boolean = false;
   let sampling: number = 0;
+  //optional seed of the random choices, set with the sampling-seed parameter
+  let samplingSeed: number | undefined = undefined;
 
   //number of last days to get average score
   const lastDaysNumber: number = 10;
 
+  //maximum number of API requests in flight at the same time, set with the max-concurrent-requests parameter
+  let maxConcurrentRequests: number = 4;
+
+  //every request to the API goes through this limiter, so that at most maxConcurrentRequests are in flight
+  let limitRequests: Limiter = createLimiter(maxConcurrentRequests);
+
+  //how many years in the past we look for data of a timeframe that is in the future
+  const maxYearsBack: number = 5;
+
+  //long timeframes are requested in chunks of this many hours (0 for a single request), set with the window-chunk-hours parameter
+  let windowChunkHours: number = 31 * 24;
+
+  //responses of the historical timeframes requested during the execution, by locations and timeframe
+  const historicalData: Map<string, Promise<EmissionsData[]>> = new Map();
+
   //weights for the forecasting, the first weight is that of the average of last 10 days and the second weight is that of the last available year on that date
   //the weights must sum to 1
   const weights = [0.5, 0.5];
@@ -109,104 +161,84 @@ export const CarbonAwareAdvisor = (params: ConfigParams): PluginInterface => {
     }
     // create an array from the global locationsArray set that was populated during the validation of the inputs
     const locationsArray = [...allowedLocations];
-    let BestData: any[] = [];
+    historicalData.clear();
     let plotted_points: any[] = [];
-    let AllBestData: any[] = [];
+    //random generator of the sampling, seeded if sampling-seed is set so that the plotted points can be reproduced
+    const random: RandomGenerator = samplingSeed !== undefined ? seededRandom(samplingSeed) : Math.random;
+    // the best of all api calls (so for each timeframe) is reduced here as the timeframes are processed
+    const allBest = new MinRatingReducer<EmissionsData>();
+
+    //if we have sampling then calculate the allocations of the plotted points per timeframe
+    const allocations: any[] = hasSampling ? calculateSubrangeAllocation(sampling) : [1];
+    const timeframesArray = Array.from(allowedTimeframes);
+
+    // The average score of every location and the data of every timeframe are independent requests,
+    // so they are all sent concurrently (getResponse keeps at most maxConcurrentRequests API calls in flight)
+    // and used afterwards in a fixed order
+    const [averageScores, timeframesData] = await Promise.all([
+      Promise.all(locationsArray.map(location => {
+        console.log(`Getting average score for location ${location} over the last ${lastDaysNumber} days`);
+        // Get the average score for the location for lastDaysNumber days
+        return getAverageScoreForLastXDays(lastDaysNumber, location);
+      })),
+      Promise.all(timeframesArray.map(timeframe => fetchTimeframeData(timeframe, locationsArray)))
+    ]);
 
     // We define a map averageScoresByLocation to find the average score for each location for the last lastDaysNumber days
     const averageScoresByLocation: { [key: string]: number | null } = {};
-
-    // For each location, get the average score for the last lastDaysNumber days
-    for (const location of locationsArray) {
-      console.log(`Getting average score for location ${location} over the last ${lastDaysNumber} days`);
-      // Get the average score for the location for lastDaysNumber days
-      const averageScore = await getAverageScoreForLastXDays(lastDaysNumber, location);
-
+    locationsArray.forEach((location, index) => {
       // Store the average score in the dictionary with the location as the key
-      averageScoresByLocation[location] = averageScore;
-    }
-
-    //if we have sampling then calculate the allocations of the plotted points per timeframe
-    const allocations: any[] = hasSampling ? calculateSubrangeAllocation(sampling) : [1];
+      averageScoresByLocation[location] = averageScores[index];
+    });
 
     //Print the allocations and the average scores by location
     console.log('Allocations:', allocations);
     console.log("Average Scores by Location:", averageScoresByLocation);
 
-    // For each timeframe, get the response from the API
-    for (const [index, timeframe] of Array.from(allowedTimeframes).entries()) {
+    // For each timeframe, process the response from the API
+    for (const [index, timeframe] of timeframesArray.entries()) {
       // Get the current allocation for that timeframe (how many plotted points we need to extract from that specific timeframe)
       const currAllocation = allocations[index] - 1;
-      //isForecast is a variable telling us if the current timeframe is in the future (meanin that there is no data from the APi for that timeframe)
-      let isForecast = false;
-      //numOfYears is a variable that tells us how many years we have gone in the past to find data for that forecast
-      let numOfYears = 0;
-      let mutableTimeframe: Timeframe = timeframe;
-      while (true) {
-        // Prepare parameters for the API call
-        const params = {
-          location: locationsArray,
-          time: mutableTimeframe.from,
-          toTime: mutableTimeframe.to
-        };
-        //if params,time and params.toTime are before now we dont have a forecast
-        if (params.time < new Date().toISOString() && params.toTime < new Date().toISOString()) {
-
-          // Returns an array of all EmissionsData objects for that timeframe and locations
-          let api_response = await getResponse("/emissions/bylocations", 'GET', params);
-          if (api_response.length > 0) {
-            console.log(`API call succeeded for timeframe starting at ${timeframe.from} `);
-            //if the api call is a forecast then we need to normalize the values to change the year and the rating
-            //for example if we made a forecat for 2025 and we are in 2023 then we need to adjust the year back to 2025 and the rating based on the weights
-            if (isForecast) {
-              api_response = adjustRatingsAndYears(api_response, numOfYears, averageScoresByLocation);
-            }
-            //the minRating is the rating from the EmissionsData  of the response that is the lowest
-            const minRating = Math.min(...api_response.map((item: EmissionsData) => item.rating));
-
-            // here we find all the EmissionsData objects from the response that have the lowest rating
-            const itemsWithMinRating = api_response.filter((item: EmissionsData) => item.rating === minRating);
-
-            // We store  that  EmissionsData objects from the response that have the lowest rating
-            BestData = BestData.concat(itemsWithMinRating);
-
-            //if we have sampling then we need to store the one (at random) of the minimum EmissionsData objects to be returned in the plotted points
-            const randomIndex = Math.floor(Math.random() * itemsWithMinRating.length);
-            plotted_points.push(itemsWithMinRating[randomIndex]);
-
-            // All of the EmissionsData objects from the response that have the lowest rating are stored in AllBestData, where the best of all api calls will be stored
-            AllBestData = [...AllBestData, ...itemsWithMinRating];
-
-            //if hasSampling is true  then we need more than the best value, we need some extra values to be returned in the plotted points (as many as the allocation says)
-            if (hasSampling) {
-              //remove from best array all the elements that are in itemsWithMinRating, we have already stored one of them
-              api_response = api_response.filter((item: EmissionsData) => !itemsWithMinRating.includes(item));
-              //select currAllocation elemnets at random from the remaining items in the api_response array
-              //and add them to the plotted_points
-              for (let i = 0; i < currAllocation; i++) {
-                const randIndex = Math.floor(Math.random() * api_response.length);
-                plotted_points.push(api_response.splice(randIndex, 1)[0]);
-              }
-            }
-            break; // Break the loop if we have found data for the current timeframe and locations and search for the next timeframe
-          }
-        }
-        //if we have reached this part of the code then that means that for this timeframe we are forecasting
-        isForecast = true;
-        // Adjust timeframe by decreasing the year by one to do an API call for the previous year the enxt time
-        mutableTimeframe = await adjustTimeframeByOneYear(mutableTimeframe);
-        //increase the numOfYears we have gone in the past by 1
-        numOfYears++;
-        if (numOfYears > 5) {// if you cant find any data 5 years in the past then stop searching
-          break;
+      //isForecast tells us if the current timeframe is in the future and numOfYears how many years we have gone in the past to find data for it
+      const numOfYears = timeframesData[index].numOfYears;
+      let api_response = timeframesData[index].response;
+      const isForecast = numOfYears > 0;
+      // if you cant find any data 5 years in the past then there is nothing to suggest for this timeframe
+      if (api_response.length === 0) {
+        continue;
+      }
+      console.log(`API call succeeded for timeframe starting at ${timeframe.from} `);
+      //if the api call is a forecast then we need to normalize the values to change the year and the rating
+      //for example if we made a forecat for 2025 and we are in 2023 then we need to adjust the year back to 2025 and the rating based on the weights
+      if (isForecast) {
+        api_response = adjustRatingsAndYears(api_response, numOfYears, averageScoresByLocation);
+      }
+      // here we find all the EmissionsData objects from the response that have the lowest rating, in a single pass
+      const timeframeBest = new MinRatingReducer<EmissionsData>();
+      timeframeBest.addAll(api_response);
+      const itemsWithMinRating = timeframeBest.items;
+
+      //if we have sampling then we need to store the one (at random) of the minimum EmissionsData objects to be returned in the plotted points
+      const randomIndex = Math.floor(random() * itemsWithMinRating.length);
+      plotted_points.push(itemsWithMinRating[randomIndex]);
+
+      // All of the EmissionsData objects from the response that have the lowest rating are passed to allBest, where the best of all api calls is kept
+      allBest.addAll(itemsWithMinRating);
+
+      //if hasSampling is true  then we need more than the best value, we need some extra values to be returned in the plotted points (as many as the allocation says)
+      if (hasSampling) {
+        //select currAllocation different elements at random from the items that do not have the lowest rating
+        //(one of those is already stored) and add them to the plotted_points, in a single pass over the response
+        const minRating = timeframeBest.rating;
+        const samples = sampleWithoutReplacement(api_response, currAllocation, random, (item: EmissionsData) => item.rating !== minRating);
+        for (const sample of samples) {
+          plotted_points.push(sample);
         }
       }
     }
 
-    // In the AllBestData we have the best values from all the api calls (so for each timeframe), we need to return the best of the best.
-    const lowestRating = Math.min(...AllBestData.map(item => item.rating));
-    // Filter all responses to get items with the lowest rating (i.e. the best responses)
-    const finalSuggestions = AllBestData.filter(item => item.rating === lowestRating);
+    // allBest holds the items with the lowest rating over all the timeframes (i.e. the best responses)
+    const finalSuggestions = allBest.items;
 
     // Store the final suggestions in the output results
     results[0].suggestions = finalSuggestions;
@@ -215,9 +247,118 @@ export const CarbonAwareAdvisor = (params: ConfigParams): PluginInterface => {
     if (hasSampling) {
       results[0]['plotted-points'] = plotted_points;
     }
+    if (responseCache) {
+      console.log('Response cache:', responseCache.stats());
+    }
+    if (httpTransport) {
+      console.log('API requests:', httpTransport.metrics());
+    }
     return results;
   }
 
+  /**
+   * Get the emissions data of a timeframe for the locations.
+   * If the timeframe is in the future (or there is no data for it) the same timeframe is looked up in the past:
+   * every earlier year up to maxYearsBack that is fully in the past is requested in one concurrent pass,
+   * and the most recent year with data is used.
+   * @param timeframe the timeframe from the impl
+   * @param locationsArray the locations to get the data for
+   * @returns the response of the API (empty if no data was found) and the number of years we have gone in the past
+   */
+  const fetchTimeframeData = async (timeframe: Timeframe, locationsArray: string[]): Promise<TimeframeData> => {
+    const now = new Date().toISOString();
+    //candidate timeframes, the one at index numOfYears is numOfYears years in the past
+    const candidates: Timeframe[] = [timeframe];
+    for (let numOfYears = 1; numOfYears <= maxYearsBack; numOfYears++) {
+      candidates.push(adjustTimeframeByOneYear(candidates[numOfYears - 1]));
+    }
+    //only timeframes whose start and end are before now can have data
+    const inThePast = (candidate: Timeframe) => candidate.from < now && candidate.to < now;
+
+    // The timeframe itself is requested alone first, a timeframe in the past almost always has data
+    if (inThePast(candidates[0])) {
+      const api_response = await getHistoricalData(candidates[0], locationsArray);
+      if (api_response.length > 0) {
+        return { response: api_response, numOfYears: 0 };
+      }
+    }
+    //if we have reached this part of the code then that means that for this timeframe we are forecasting
+    const pastYears = candidates.map((_, numOfYears) => numOfYears).filter(numOfYears => numOfYears > 0 && inThePast(candidates[numOfYears]));
+    const responses = await Promise.all(pastYears.map(numOfYears => getHistoricalData(candidates[numOfYears], locationsArray)));
+    const found = responses.findIndex(api_response => api_response.length > 0);
+    if (found >= 0) {
+      return { response: responses[found], numOfYears: pastYears[found] };
+    }
+    // if you cant find any data maxYearsBack years in the past then there is nothing for this timeframe
+    return { response: [], numOfYears: maxYearsBack + 1 };
+  }
+
+  /**
+   * Get the emissions data of a timeframe in the past for the locations.
+   * Timeframes longer than windowChunkHours are requested in consecutive chunks. The API answers [time, toTime)
+   * with the data points of [time - 1h, toTime - 1h), so the answers of the chunks do not overlap and together
+   * are exactly the answer of a single request.
+   * Requests are remembered for the whole execution, so timeframes of different years that map to
+   * the same historical timeframe share the API calls.
+   * @param timeframe the timeframe in the past
+   * @param locationsArray the locations to get the data for
+   * @returns the data points of the timeframe, in the order of the chunks
+   */
+  const getHistoricalData = async (timeframe: Timeframe, locationsArray: string[]): Promise<EmissionsData[]> => {
+    const chunks = splitTimeframe(timeframe, windowChunkHours);
+    if (chunks.length === 1) {
+      return getHistoricalChunk(timeframe, locationsArray);
+    }
+    const responses = await Promise.all(chunks.map(chunk => getHistoricalChunk(chunk, locationsArray)));
+    return responses.flat();
+  }
+
+  /**
+   * Get (once per execution) the emissions data of a timeframe in the past for the locations.
+   */
+  const getHistoricalChunk = (timeframe: Timeframe, locationsArray: string[]): Promise<EmissionsData[]> => {
+    const key = `${locationsArray.join(',')}|${timeframe.from}|${timeframe.to}`;
+    let request = historicalData.get(key);
+    if (request === undefined) {
+      // Prepare parameters for the API call
+      const params = {
+        location: locationsArray,
+        time: timeframe.from,
+        toTime: timeframe.to
+      };
+      // Returns an array of all EmissionsData objects for that timeframe and locations
+      request = getResponse("/emissions/bylocations", 'GET', params) as Promise<EmissionsData[]>;
+      historicalData.set(key, request);
+      // a failed request is not remembered
+      request.catch(() => historicalData.delete(key));
+    }
+    return request;
+  }
+
+  /**
+   * Split a timeframe into consecutive chunks of at most `hours` hours.
+   * The first chunk starts and the last chunk ends with the original strings, so a short timeframe is not changed.
+   * @param timeframe the timeframe to split
+   * @param hours the length of the chunks, 0 to not split
+   * @returns the chunks in time order
+   */
+  const splitTimeframe = (timeframe: Timeframe, hours: number): Timeframe[] => {
+    const from = Date.parse(timeframe.from);
+    const to = Date.parse(timeframe.to);
+    const step = hours * 60 * 60 * 1000;
+    if (!(step > 0) || to - from <= step) {
+      return [timeframe];
+    }
+    const chunks: Timeframe[] = [];
+    for (let start = from; start < to; start += step) {
+      chunks.push({
+        from: start === from ? timeframe.from : new Date(start).toISOString(),
+        to: start + step >= to ? timeframe.to : new Date(start + step).toISOString()
+      });
+    }
+    return chunks;
+  }
+
   /**
   * this function adjusts the ratings and years of the forecasted data
   * it takes the forecasted data, the number of years to add and the average scores by location
@@ -270,21 +411,62 @@ export const CarbonAwareAdvisor = (params: ConfigParams): PluginInterface => {
    * Set the supported locations based on the locations.json file
    * the supported locations are the locations that the model can perform api calls for
    * but also include key word regions (such as europe) that are sets of multiple locations
+   * The file is read once per process and its set is shared by all the instances of the model.
    */
   const setSupportedLocations = async (): Promise<void> => {
-    // Get the list of supported locations from the locarions.json file
-    const localData = await loadLocations();
-    // For each region in localData,  and the locations of that region to the set of supported locations
-    Object.keys(localData).forEach(key => {
-      const locationsArray = localData[key];
-      locationsArray.forEach((location: string) => {
-        // Add each server to the set of supported locations
-        supportedLocations.add(location);
+    supportedLocations = await loadSupportedLocations();
+  }
+
+  /**
+   * The supported locations and key word regions of the locations.json file,
+   * loaded on the first use and shared by all the instances of the model in the process.
+   */
+  const loadSupportedLocations = (): Promise<Set<string>> =>
+    loadStaticData(`carbon-aware-advisor/locations:${locationsFilePath}`, async () => {
+      // Get the list of supported locations from the locarions.json file
+      const localData = await loadLocations();
+      const supported: Set<string> = new Set();
+      // For each region in localData, add the locations of that region and the region itself to the set of supported locations
+      Object.keys(localData).forEach(key => {
+        const locationsArray: string[] = localData[key];
+        locationsArray.forEach(location => supported.add(location));
+        supported.add(key);
       });
-      // Add each region itself to the set of supported locations
-      supportedLocations.add(key);
+      return supported;
     });
-  }
+
+  /**
+   * The transport of the requests to the API, created with the validated parameters on the first request
+   * and then reused so that its connections are kept alive between requests and executions.
+   */
+  const getTransport = (): HttpTransport => {
+    if (httpTransport === undefined) {
+      httpTransport = new HttpTransport({ baseURL: API_URL, timeoutMs: requestTimeoutMs, maxRetries });
+    }
+    return httpTransport;
+  };
+
+  /**
+   * Answer an /emissions/bylocations query from the local dataset of the data-path parameter.
+   * @param params The parameters of the query: location (one or many), time and toTime.
+   * @returns The emissions data the API returns for the locations and the [time, toTime) window.
+   * @throws Error if the dataset cannot be loaded.
+   */
+  const queryLocalEmissions = async (params: any): Promise<EmissionsData[]> => {
+    if (localEmissions === undefined) {
+      console.log(`Loading emissions data from ${dataPath}`);
+      localEmissions = LocalEmissionsSource.load(dataPath!);
+    }
+    let source: LocalEmissionsSource | undefined = undefined;
+    try {
+      source = await localEmissions;
+    } catch (error) {
+      localEmissions = undefined;
+      throwError(Error, `Could not load emissions data from ${dataPath}: ${(error as Error).message}`);
+    }
+    const locations = Array.isArray(params.location) ? params.location : [params.location];
+    return source!.query(locations, params.time, params.toTime);
+  };
 
   /**
    * Send a request to the carbon-aware-sdk API.
@@ -295,57 +477,37 @@ export const CarbonAwareAdvisor = (params: ConfigParams): PluginInterface => {
    * @throws Error if the request fails and stops the execution of the model.
    */
   const getResponse = async (route: string, method: string = 'GET', params: any = null): Promise<any> => {
-    const url = new URL(`${API_URL}${route}`);
-
-    // Manually serialize params to match the required format: 'location=eastus&location=westus&...'
-    let queryString = '';
-    if (params) {
-      queryString = Object.entries(params).map(([key, value]) => {
-        if (Array.isArray(value)) {
-          // Convert each value to a string before encoding and repeat the key for each value in the array
-          return value.map(v => `${encodeURIComponent(key)}=${encodeURIComponent(String(v))}`).join('&');
-        } else {
-          // Convert value to a string before encoding and directly append to query string
-          return `${encodeURIComponent(key)}=${encodeURIComponent(String(value))}`;
-        }
-      }).join('&');
-    }
-    //the final url is the url of the api call we will be performing
-    const finalUrl = `${url}${queryString ? '?' + queryString : ''}`;
-    console.log(`Sending ${method} request to ${finalUrl}`);
-
-    let attempts = 0;
-    const maxAttempts = 3; // Initial attempt + 2 retries if we get error 500 from the API
-
-    while (attempts < maxAttempts) {
-      try {
-        const response = await axios({
-          url: finalUrl,
-          method: method,
-        });
-        //if the api call is successful then return the data
-        return response.data;
-      } catch (error) {
-        //if we get an error from the api
-        attempts++;
-
-        // Use a type guard to check if the error is an AxiosError
-        if (axios.isAxiosError(error)) {
-          const axiosError = error;
-          console.error(axiosError.message);
-          //if we get error 500 then retry the api call up to 2 more times
-          if (axiosError.response && axiosError.response.status === 500 && attempts < maxAttempts) {
-            console.log(`Attempt ${attempts} failed with status 500. Retrying...`);
-          } else {
-            console.log()
-            throwError(Error, axiosError.message);
-          }
-        } else {
-          // If it's not an AxiosError, it might be some other error (like a network error, etc.)
-          throwError(Error, 'An unexpected error occurred');
-        }
+    // With a local dataset the emissions are answered in memory, no request is sent
+    if (dataPath !== undefined && route === '/emissions/bylocations') {
+      return queryLocalEmissions(params);
+    }
+
+    // Responses that are already in the cache are not requested again
+    const cacheable = responseCache !== undefined && method.toUpperCase() === 'GET';
+    if (cacheable) {
+      const cached = await responseCache!.get(API_URL, route, params);
+      if (cached !== undefined) {
+        return cached;
       }
     }
+
+    try {
+      // the transport retries 429, 5xx and network errors with backoff, so any error here is final;
+      // the limiter is shared by all the requests of the execution, the chunks and past years included
+      const data = await limitRequests(() => getTransport().request(route, method, params));
+      if (cacheable) {
+        await responseCache!.put(API_URL, route, params, data);
+      }
+      return data;
+    } catch (error) {
+      // Use a type guard to check if the error is an AxiosError
+      if (axios.isAxiosError(error)) {
+        console.error(`${method} ${route} failed: ${error.message}`);
+        throwError(Error, error.message);
+      }
+      // If it's not an AxiosError, it might be some other error
+      throwError(Error, 'An unexpected error occurred');
+    }
   };
 
   /**
@@ -360,7 +522,7 @@ export const CarbonAwareAdvisor = (params: ConfigParams): PluginInterface => {
     }
 
     await setSupportedLocations(); // Set the supported locations based on the locations.json file to see if the locations we got as inputs are among them
-    validateParams(); // Validate params
+    await validateParams(); // Validate params
     console.log('Validation complete.')
   };
 
@@ -370,7 +532,7 @@ export const CarbonAwareAdvisor = (params: ConfigParams): PluginInterface => {
    * @param params The inputs provided by the user in the impl file
    * @throws InputValidationError if the inputs are invalid and stops the execution of the model.
    */
-  const validateParams = () => {
+  const validateParams = async () => {
     //print the params received from the impl file for debugging puproses
     //console.log("The params received from the impl:",JSON.stringify(params));
 
@@ -401,6 +563,110 @@ export const CarbonAwareAdvisor = (params: ConfigParams): PluginInterface => {
     } else {
       console.log('Sampling not provided, ignoring');
     }
+
+    // Check if the 'sampling-seed' property exists in the impl file
+    if (params && params['sampling-seed'] !== undefined) {
+      validateSamplingSeed(params['sampling-seed']);
+    }
+
+    // Check if the 'max-concurrent-requests' property exists in the impl file
+    if (params && params['max-concurrent-requests'] !== undefined) {
+      validateMaxConcurrentRequests(params['max-concurrent-requests']);
+    }
+
+    // Check if the 'data-path' property exists in the impl file
+    if (params && params['data-path'] !== undefined) {
+      await validateDataPath(params['data-path']);
+    }
+
+    // Check if the 'request-timeout-ms' property exists in the impl file
+    if (params && params['request-timeout-ms'] !== undefined) {
+      validateRequestTimeout(params['request-timeout-ms']);
+    }
+
+    // Check if the 'max-retries' property exists in the impl file
+    if (params && params['max-retries'] !== undefined) {
+      validateMaxRetries(params['max-retries']);
+    }
+
+    // Check if the 'window-chunk-hours' property exists in the impl file
+    if (params && params['window-chunk-hours'] !== undefined) {
+      validateWindowChunkHours(params['window-chunk-hours']);
+    }
+  };
+
+  /**
+   * Validate the max-concurrent-requests parameter to make sure that it is a positive integer.
+   * @param value The max-concurrent-requests parameter provided by the user.
+   * @throws InputValidationError if the parameter is invalid and stops the execution of the model.
+   * @returns void
+   */
+  const validateMaxConcurrentRequests = (value: any): void => {
+    if (typeof value !== 'number' || !Number.isInteger(value) || value <= 0) {
+      throwError(InputValidationError, `Parameter max-concurrent-requests must be a positive integer`);
+    }
+    maxConcurrentRequests = value;
+    limitRequests = createLimiter(value);
+  };
+
+  /**
+   * Validate the data-path parameter to make sure that it is the path of an existing file.
+   * @param value The data-path parameter provided by the user.
+   * @throws InputValidationError if the parameter is invalid and stops the execution of the model.
+   * @returns void
+   */
+  const validateDataPath = async (value: any): Promise<void> => {
+    if (typeof value !== 'string' || value.trim() === '') {
+      throwError(InputValidationError, `Parameter data-path must be the path of an emissions data file`);
+    }
+    try {
+      await fsPromises.access(value);
+    } catch (error) {
+      throwError(InputValidationError, `Emissions data file ${value} not found`);
+    }
+    if (dataPath !== value) {
+      localEmissions = undefined;
+    }
+    dataPath = value;
+  };
+
+  /**
+   * Validate the request-timeout-ms parameter to make sure that it is a positive integer.
+   * @param value The request-timeout-ms parameter provided by the user.
+   * @throws InputValidationError if the parameter is invalid and stops the execution of the model.
+   * @returns void
+   */
+  const validateRequestTimeout = (value: any): void => {
+    if (typeof value !== 'number' || !Number.isInteger(value) || value <= 0) {
+      throwError(InputValidationError, `Parameter request-timeout-ms must be a positive integer`);
+    }
+    requestTimeoutMs = value;
+  };
+
+  /**
+   * Validate the max-retries parameter to make sure that it is a non-negative integer.
+   * @param value The max-retries parameter provided by the user.
+   * @throws InputValidationError if the parameter is invalid and stops the execution of the model.
+   * @returns void
+   */
+  const validateMaxRetries = (value: any): void => {
+    if (typeof value !== 'number' || !Number.isInteger(value) || value < 0) {
+      throwError(InputValidationError, `Parameter max-retries must be a non-negative integer`);
+    }
+    maxRetries = value;
+  };
+
+  /**
+   * Validate the window-chunk-hours parameter to make sure that it is a non-negative number.
+   * @param value The window-chunk-hours parameter provided by the user.
+   * @throws InputValidationError if the parameter is invalid and stops the execution of the model.
+   * @returns void
+   */
+  const validateWindowChunkHours = (value: any): void => {
+    if (typeof value !== 'number' || isNaN(value) || value < 0) {
+      throwError(InputValidationError, `Parameter window-chunk-hours must be a non-negative number`);
+    }
+    windowChunkHours = value;
   };
 
   /**
@@ -419,6 +685,19 @@ export const CarbonAwareAdvisor = (params: ConfigParams): PluginInterface => {
     }
   };
 
+  /**
+   * Validate the sampling-seed parameter to make sure that it is an integer.
+   * @param seed The sampling-seed parameter provided by the user.
+   * @throws InputValidationError if the seed is invalid and stops the execution of the model.
+   * @returns void
+   */
+  const validateSamplingSeed = (seed: any): void => {
+    if (typeof seed !== 'number' || !Number.isInteger(seed)) {
+      throwError(InputValidationError, `Parameter sampling-seed must be an integer`);
+    }
+    samplingSeed = seed;
+  };
+
   /**
   * Validate the allowed-locations parameter to make sure that it is an array of locations
   * and that those locations are supported
@@ -615,6 +894,9 @@ export const CarbonAwareAdvisor = (params: ConfigParams): PluginInterface => {
     metadata,
     execute,
     getAverageScoreForLastXDays,
-    supportedLocations
+    //a getter, because the set is replaced by the shared one when the locations are validated
+    get supportedLocations() {
+      return supportedLocations;
+    }
   };
 }
@@ -0,0 +1,151 @@
+import { promises as fsPromises } from 'fs';
+import { promisify } from 'util';
+import { gunzip } from 'zlib';
+
+const gunzipAsync = promisify(gunzip);
+
+/**
+ * A data point in the format of the /emissions/bylocations route of the Carbon Aware WebApi.
+ */
+export interface EmissionsRecord {
+  location: string;
+  time: string;
+  rating: number;
+  duration: string;
+}
+
+/**
+ * The data points of one location sorted by time, with the times in epoch milliseconds.
+ */
+type LocationIndex = {
+  starts: Float64Array;
+  records: EmissionsRecord[];
+};
+
+/**
+ * The API answers a [time, toTime) window with the data points whose time is in [time - 1h, toTime - 1h).
+ */
+const API_OFFSET_MS = 60 * 60 * 1000;
+
+/**
+ * Times without an offset are UTC, like in the harvesting tools.
+ */
+const parseTime = (value: string): number => {
+  const hasOffset = /([zZ]|[+-]\d\d:?\d\d)$/.test(value);
+  return Date.parse(hasOffset || !value.includes('T') ? value : `${value}Z`);
+};
+
+/**
+ * Durations are "HH:MM:SS" like in the responses of the API.
+ */
+const parseDuration = (duration: string): number => {
+  const [hours, minutes, seconds] = duration.split(':').map(Number);
+  return ((hours * 60 + minutes) * 60 + seconds) * 1000;
+};
+
+/**
+ * Index of the first element of `values` (sorted ascending) that is not less than `value`.
+ */
+const lowerBound = (values: Float64Array, value: number): number => {
+  let low = 0;
+  let high = values.length;
+  while (low < high) {
+    const middle = (low + high) >>> 1;
+    if (values[middle] < value) {
+      low = middle + 1;
+    } else {
+      high = middle;
+    }
+  }
+  return low;
+};
+
+/**
+ * In-memory emissions dataset that answers the queries of the advisor without the Carbon Aware WebApi.
+ * Reads the harvested data of Code/carbon-aware-webapi: a {"Emissions": [...]} or [...] JSON document (emissions_data.json)
+ * or one record per line (.ndjson), optionally gzip compressed (.gz).
+ * Like the API (and local_webapi.py), a query for the [time, toTime) window returns the data points whose time is in
+ * [time - 1h, toTime - 1h).
+ */
+export class LocalEmissionsSource {
+  private constructor(private readonly index: Map<string, LocationIndex>) { }
+
+  /**
+   * Reads and indexes the dataset in `dataPath`.
+   * @throws Error if the file cannot be read or is not in one of the supported formats
+   */
+  public static async load(dataPath: string): Promise<LocalEmissionsSource> {
+    let content = await fsPromises.readFile(dataPath);
+    let name = dataPath;
+    if (name.endsWith('.gz')) {
+      content = await gunzipAsync(content);
+      name = name.slice(0, -'.gz'.length);
+    }
+    const text = content.toString('utf-8');
+    let records: EmissionsRecord[];
+    if (name.endsWith('.ndjson')) {
+      records = text.split('\n').filter(line => line.trim() !== '').map(line => JSON.parse(line));
+    } else {
+      const document = JSON.parse(text);
+      records = Array.isArray(document) ? document : document?.Emissions;
+      if (!Array.isArray(records)) {
+        throw new Error(`${dataPath} has no 'Emissions' array`);
+      }
+    }
+    return LocalEmissionsSource.fromRecords(records);
+  }
+
+  /**
+   * Indexes `records` by location and start time.
+   */
+  public static fromRecords(records: EmissionsRecord[]): LocalEmissionsSource {
+    const byLocation: Map<string, { start: number, record: EmissionsRecord }[]> = new Map();
+    for (const record of records) {
+      const start = parseTime(record.time);
+      if (isNaN(start) || isNaN(parseDuration(record.duration))) {
+        throw new Error(`Invalid emissions record ${JSON.stringify(record)}`);
+      }
+      const points = byLocation.get(record.location) ?? [];
+      points.push({ start, record });
+      byLocation.set(record.location, points);
+    }
+
+    const index: Map<string, LocationIndex> = new Map();
+    byLocation.forEach((points, location) => {
+      points.sort((a, b) => a.start - b.start);
+      index.set(location, {
+        starts: Float64Array.from(points, point => point.start),
+        records: points.map(point => point.record),
+      });
+    });
+    return new LocalEmissionsSource(index);
+  }
+
+  /**
+   * The locations that have data.
+   */
+  public get locations(): string[] {
+    return [...this.index.keys()];
+  }
+
+  /**
+   * The data points of `locations` the API returns for the [time, toTime) window, by location and then by time like the API.
+   * Locations without data have no data points.
+   */
+  public query(locations: string[], time: string, toTime: string): EmissionsRecord[] {
+    const from = parseTime(time) - API_OFFSET_MS;
+    const to = parseTime(toTime) - API_OFFSET_MS;
+    const result: EmissionsRecord[] = [];
+    for (const location of new Set(locations)) {
+      const data = this.index.get(location);
+      if (data === undefined) {
+        continue;
+      }
+      const last = lowerBound(data.starts, to);
+      for (let i = lowerBound(data.starts, from); i < last; i++) {
+        result.push({ ...data.records[i] });
+      }
+    }
+    return result;
+  }
+}
@@ -0,0 +1,44 @@
+/**
+ * Keeps the items with the lowest rating while the items are streamed through it once.
+ * Unlike Math.min(...items.map(...)) it never puts the items on the call stack, so it works for any number of items,
+ * and it only stores the current ties.
+ */
+export class MinRatingReducer<T extends { rating: number }> {
+  private minRating: number = Infinity;
+  private ties: T[] = [];
+
+  /**
+   * Add one item; it replaces the current ties if its rating is lower, and joins them if it is equal.
+   */
+  public add(item: T): void {
+    if (item.rating < this.minRating) {
+      this.minRating = item.rating;
+      this.ties = [item];
+    } else if (item.rating === this.minRating) {
+      this.ties.push(item);
+    }
+  }
+
+  /**
+   * Add every item of `items` in order.
+   */
+  public addAll(items: Iterable<T>): void {
+    for (const item of items) {
+      this.add(item);
+    }
+  }
+
+  /**
+   * The lowest rating seen so far, Infinity if no item was added.
+   */
+  public get rating(): number {
+    return this.minRating;
+  }
+
+  /**
+   * The items with the lowest rating in the order they were added.
+   */
+  public get items(): T[] {
+    return this.ties;
+  }
+}
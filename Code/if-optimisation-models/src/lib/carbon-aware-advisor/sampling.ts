@@ -0,0 +1,47 @@
+/**
+ * A function returning random numbers in [0, 1), like Math.random.
+ */
+export type RandomGenerator = () => number;
+
+/**
+ * Small seeded pseudo-random generator (mulberry32), so that sampled plotted-points can be reproduced.
+ * @param seed any number, only its integer 32 bits are used
+ * @returns a generator of numbers in [0, 1)
+ */
+export const seededRandom = (seed: number): RandomGenerator => {
+  let state = seed >>> 0;
+  return () => {
+    state = (state + 0x6D2B79F5) >>> 0;
+    let t = state;
+    t = Math.imul(t ^ (t >>> 15), t | 1);
+    t ^= t + Math.imul(t ^ (t >>> 7), t | 61);
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+  };
+};
+
+/**
+ * Picks `count` different items at random (partial Fisher–Yates shuffle) among the items for which `include` is true.
+ * Takes O(n) time for the n items plus O(count) for the picks, and never changes `items`.
+ * @param items the items to pick from
+ * @param count how many items to pick; fewer are returned if there are not enough items
+ * @param random the random generator
+ * @param include which items can be picked, all of them by default
+ * @returns the picked items in the order they were picked
+ */
+export const sampleWithoutReplacement = <T>(
+  items: T[],
+  count: number,
+  random: RandomGenerator,
+  include: (item: T) => boolean = () => true
+): T[] => {
+  const pool = items.filter(include);
+  const picks = Math.min(Math.max(count, 0), pool.length);
+  for (let i = 0; i < picks; i++) {
+    const j = i + Math.floor(random() * (pool.length - i));
+    const picked = pool[j];
+    pool[j] = pool[i];
+    pool[i] = picked;
+  }
+  pool.length = picks;
+  return pool;
+};
@@ -35,6 +35,29 @@ export class CloudInstance {
     }
 }
 
+/**
+ * Version of the files written by scripts/compile_instances.py.
+ */
+const COMPILED_VERSION = 2;
+
+/**
+ * Catalog compiled by scripts/compile_instances.py: the models of family i are models[family_offsets[i]:family_offsets[i + 1]],
+ * sorted by RAM in descending order, and the prices of model i are price_regions/price_values[price_offsets[i]:price_offsets[i + 1]].
+ */
+type CompiledCatalog = {
+    version: number;
+    source_sha256: string;
+    families: string[];
+    family_offsets: number[];
+    models: string[];
+    vcpus: number[];
+    ram: number[];
+    regions: string[];
+    price_offsets: number[];
+    price_regions: number[];
+    price_values: number[];
+};
+
 /**
  * Represents a CPU database.
  */
@@ -42,6 +65,7 @@ export class CPUDatabase {
     private modelToFamily = new Map<string, string>();
     private familyToModels = new Map<string, CloudInstance[]>();
     private nameToInstance = new Map<string, CloudInstance>();
+    private sortedFamilies = new Map<string, CloudInstance[]>();
 
     /**
      * Retrieves an instance by model name.
@@ -60,16 +84,7 @@ export class CPUDatabase {
     public async loadModelData(path: string) {
         try {
             const data = await fs_async.readFile(path, 'utf8');
-            const jsonData = JSON.parse(data);
-            for (const familyName in jsonData) {
-                const models = jsonData[familyName];
-                const cpuModels = models.map((model: any) => new CloudInstance(model.model, model.vCPUs, model.RAM, model.Price));
-                this.familyToModels.set(familyName, cpuModels);
-                models.forEach((model: any) => {
-                    this.modelToFamily.set(model.model, familyName);
-                    this.nameToInstance.set(model.model, new CloudInstance(model.model, model.vCPUs, model.RAM, model.Price));
-                });
-            }
+            this.addFamilies(JSON.parse(data));
         } catch (error) {
             console.error('Error reading file:', error);
         }
@@ -78,21 +93,58 @@ export class CPUDatabase {
     public loadModelData_sync(path: string) {
         try {
             const data = fs.readFileSync(path, 'utf8');
-            const jsonData = JSON.parse(data);
-            for (const familyName in jsonData) {
-                const models = jsonData[familyName];
-                const cpuModels = models.map((model: any) => new CloudInstance(model.model, model.vCPUs, model.RAM, model.Price));
-                this.familyToModels.set(familyName, cpuModels);
-                models.forEach((model: any) => {
-                    this.modelToFamily.set(model.model, familyName);
-                    this.nameToInstance.set(model.model, new CloudInstance(model.model, model.vCPUs, model.RAM, model.Price));
-                });
-            }
+            this.addFamilies(JSON.parse(data));
         } catch (error) {
             console.error('Error reading file:', error);
         }
     }
 
+    /**
+     * Loads model data compiled by scripts/compile_instances.py, whose families are already sorted by RAM.
+     * @param path The path to the compiled JSON file.
+     * @param sourceHash If given, the SHA-256 (hex) of the JSON catalog the file must have been compiled from.
+     * @throws Error if the file cannot be read, was compiled by another version of the script or from another catalog.
+     */
+    public async loadCompiled(path: string, sourceHash?: string) {
+        const compiled: CompiledCatalog = JSON.parse(await fs_async.readFile(path, 'utf8'));
+        if (compiled.version !== COMPILED_VERSION) {
+            throw new Error(`Unsupported compiled catalog version ${compiled.version} in ${path}`);
+        }
+        if (sourceHash !== undefined && compiled.source_sha256 !== sourceHash) {
+            throw new Error(`${path} is stale, run scripts/compile_instances.py again`);
+        }
+        compiled.families.forEach((familyName, family) => {
+            const members: CloudInstance[] = [];
+            for (let i = compiled.family_offsets[family]; i < compiled.family_offsets[family + 1]; i++) {
+                const price: { [region: string]: number } = {};
+                for (let p = compiled.price_offsets[i]; p < compiled.price_offsets[i + 1]; p++) {
+                    price[compiled.regions[compiled.price_regions[p]]] = compiled.price_values[p];
+                }
+                const instance = new CloudInstance(compiled.models[i], compiled.vcpus[i], compiled.ram[i], price);
+                members.push(instance);
+                this.modelToFamily.set(instance.model, familyName);
+                this.nameToInstance.set(instance.model, instance);
+            }
+            this.familyToModels.set(familyName, members);
+            this.sortedFamilies.set(familyName, members);
+        });
+    }
+
+    /**
+     * Adds the families of a catalog ({family: [{model, vCPUs, RAM, Price}]}), with one CloudInstance per model.
+     */
+    private addFamilies(jsonData: any) {
+        for (const familyName in jsonData) {
+            const models = jsonData[familyName];
+            const cpuModels: CloudInstance[] = models.map((model: any) => new CloudInstance(model.model, model.vCPUs, model.RAM, model.Price));
+            this.familyToModels.set(familyName, cpuModels);
+            this.sortedFamilies.delete(familyName);
+            cpuModels.forEach((instance) => {
+                this.modelToFamily.set(instance.model, familyName);
+                this.nameToInstance.set(instance.model, instance);
+            });
+        }
+    }
 
     /**
      * Retrieves the model family based on a model name.
@@ -113,4 +165,27 @@ export class CPUDatabase {
     public getFamilies(): Map<string, CloudInstance[]> {
         return this.familyToModels;
     }
+
+    /**
+     * Retrieves the model family of a model name sorted in descending order of RAM.
+     * The sorted family is computed once per family and shared, it must not be modified.
+     * @param modelName The model name of the instance.
+     * @returns The sorted array of CloudInstance instances of the model family, or null if not found.
+     */
+    public getSortedModelFamily(modelName: string): CloudInstance[] | null {
+        const familyName = this.modelToFamily.get(modelName);
+        if (!familyName) {
+            return null;
+        }
+        let sorted = this.sortedFamilies.get(familyName);
+        if (!sorted) {
+            const family = this.familyToModels.get(familyName);
+            if (!family) {
+                return null;
+            }
+            sorted = [...family].sort((a, b) => b.RAM - a.RAM);
+            this.sortedFamilies.set(familyName, sorted);
+        }
+        return sorted;
+    }
 }
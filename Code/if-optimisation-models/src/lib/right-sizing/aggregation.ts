@@ -0,0 +1,119 @@
+import { PluginParams } from '../../types/common';
+
+export const AGGREGATION_STATISTICS = ['p95', 'max', 'mean'] as const;
+export type AggregationStatistic = typeof AGGREGATION_STATISTICS[number];
+
+/**
+ * Streaming reduction of the utilisation samples of a group to one statistic.
+ */
+class UtilReducer {
+    private count = 0;
+    private sum = 0;
+    private max = -Infinity;
+    private values: number[] = [];
+
+    constructor(private readonly statistic: AggregationStatistic) { }
+
+    public add(value: any): void {
+        const util = typeof value === 'string' ? parseFloat(value) : value;
+        if (typeof util !== 'number' || isNaN(util)) {
+            return;
+        }
+        this.count++;
+        this.sum += util;
+        this.max = Math.max(this.max, util);
+        // Only the percentile needs the samples themselves
+        if (this.statistic === 'p95') {
+            this.values.push(util);
+        }
+    }
+
+    /**
+     * The statistic of the samples (the 95th percentile is nearest-rank), undefined if there was no sample.
+     */
+    public result(): number | undefined {
+        if (this.count === 0) {
+            return undefined;
+        }
+        switch (this.statistic) {
+            case 'max':
+                return this.max;
+            case 'mean':
+                return this.sum / this.count;
+            case 'p95': {
+                const sorted = Float64Array.from(this.values).sort();
+                return sorted[Math.ceil(0.95 * sorted.length) - 1];
+            }
+        }
+    }
+}
+
+type Group = {
+    first: PluginParams;
+    start: number;
+    end: number;
+    cpuUtil: UtilReducer;
+    memUtil: UtilReducer;
+};
+
+/**
+ * Groups the observations of the same instance (cloud vendor, instance type, location and target-cpu-util)
+ * in windows of windowSeconds aligned on the epoch, and reduces the cpu-util and mem-util of each group to one statistic
+ * in a single pass over the inputs.
+ * Each group becomes one input: a copy of its first observation with the statistics as cpu-util and mem-util,
+ * and a duration that covers all its observations. The groups keep the order of their first observation;
+ * inputs without cloud-instance-type or a valid timestamp are kept as they are.
+ *
+ * @param inputs The observations.
+ * @param windowSeconds The length of the windows in seconds.
+ * @param statistic The statistic of the utilisation of a group.
+ * @returns One input per group.
+ */
+export const aggregateInputs = (inputs: PluginParams[], windowSeconds: number, statistic: AggregationStatistic): PluginParams[] => {
+    const windowMs = windowSeconds * 1000;
+    const groups: Map<string, Group> = new Map();
+    // The groups and the inputs that are kept as they are, in the order of the inputs
+    const ordered: ({ group: Group } | { input: PluginParams })[] = [];
+
+    for (const input of inputs) {
+        const start = Date.parse(input['timestamp']);
+        if (!('cloud-instance-type' in input) || isNaN(start)) {
+            ordered.push({ input });
+            continue;
+        }
+        const duration = typeof input['duration'] === 'number' ? input['duration'] * 1000 : 0;
+        const window = Math.floor(start / windowMs);
+        const key = [input['cloud-vendor'], input['cloud-instance-type'], input['location'], input['target-cpu-util'], window].join('|');
+        let group = groups.get(key);
+        if (group === undefined) {
+            group = { first: input, start, end: start + duration, cpuUtil: new UtilReducer(statistic), memUtil: new UtilReducer(statistic) };
+            groups.set(key, group);
+            ordered.push({ group });
+        }
+        group.start = Math.min(group.start, start);
+        group.end = Math.max(group.end, start + duration);
+        group.cpuUtil.add(input['cpu-util']);
+        group.memUtil.add(input['mem-util']);
+    }
+
+    return ordered.map(item => {
+        if ('input' in item) {
+            return item.input;
+        }
+        const group = item.group;
+        const aggregated: PluginParams = {
+            ...group.first,
+            timestamp: new Date(group.start).toISOString(),
+            duration: (group.end - group.start) / 1000,
+        };
+        const cpuUtil = group.cpuUtil.result();
+        const memUtil = group.memUtil.result();
+        if (cpuUtil !== undefined) {
+            aggregated['cpu-util'] = cpuUtil;
+        }
+        if (memUtil !== undefined) {
+            aggregated['mem-util'] = memUtil;
+        }
+        return aggregated;
+    });
+};
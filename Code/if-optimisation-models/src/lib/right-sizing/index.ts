@@ -5,10 +5,14 @@ import { fixFloat } from '../../util/util';
 import { PluginInterface } from '../../interfaces';
 import { ConfigParams, PluginParams } from '../../types/common';
 import { validate, atLeastOneDefined } from '../../util/validations';
-import { InstanceData, CombinationData, CurrentData, OriginalData } from '../../types/right-sizing';
+import { InstanceData, CombinationData, CombinationState, OriginalData } from '../../types/right-sizing';
 
 import { CPUDatabase, CloudInstance } from './CPUFamily';
+import { AGGREGATION_STATISTICS, AggregationStatistic, aggregateInputs } from './aggregation';
+import { loadStaticData } from '../../util/static-data';
+import { LruCache, LruCacheStats } from '../../util/lru-cache';
 import * as path from 'path';
+import { promises as fsPromises } from 'fs';
 
 /**
  * Implementation of the ModelPluginInterface for the Right Sizing model.
@@ -20,7 +24,16 @@ export const RightSizingModel = (params: ConfigParams): PluginInterface => {
     };
 
     let database: CPUDatabase = new CPUDatabase();
+    // Name of the current database in Cache, part of the keys of the memo
+    let databaseName: string = 'custom';
     const Cache: Map<string, CPUDatabase> = new Map();
+    // Right-sizing results of the recent (database, instance, region, target util, required vCPUs, target RAM)
+    let memo: LruCache<string, InstanceData[]> = new LruCache(1024);
+    // cpu-util and mem-util are rounded up to a multiple of this many percentage points before sizing (0 keeps them)
+    let utilQuantum: number = 0;
+    // Length in seconds of the windows in which the observations of an instance are sized once (undefined sizes each one)
+    let aggregationWindow: number | undefined = undefined;
+    let aggregationStatistic: AggregationStatistic = 'p95';
     const builtinDataPath = __dirname;
     const cpuMetrics = ['cpu-util', 'cloud-vendor', 'cloud-instance-type'];
 
@@ -40,6 +53,37 @@ export const RightSizingModel = (params: ConfigParams): PluginInterface => {
                 console.error('Error: Invalid instance data path type.');
             }
         }
+        // Number of right-sizing results kept in memory for repeated observations, 0 disables the memo
+        if (configParams && 'memo-size' in configParams) {
+            const memoSize = configParams['memo-size'];
+            if (typeof memoSize !== 'number' || !Number.isInteger(memoSize) || memoSize < 0) {
+                throw new Error('memo-size must be a non-negative integer');
+            }
+            memo = new LruCache(memoSize);
+        }
+        // Optional quantisation of the utilisation, so that observations with close values share a result
+        if (configParams && 'util-quantum' in configParams) {
+            const quantum = configParams['util-quantum'];
+            if (typeof quantum !== 'number' || isNaN(quantum) || quantum < 0 || quantum > 100) {
+                throw new Error('util-quantum must be a number between 0 and 100');
+            }
+            utilQuantum = quantum;
+        }
+        // Optional aggregation of the observations of each instance per window, sized once per window
+        if (configParams && 'aggregation-window' in configParams) {
+            const window = configParams['aggregation-window'];
+            if (typeof window !== 'number' || isNaN(window) || window <= 0) {
+                throw new Error('aggregation-window must be a positive number of seconds');
+            }
+            aggregationWindow = window;
+        }
+        if (configParams && 'aggregation-statistic' in configParams) {
+            const statistic = configParams['aggregation-statistic'];
+            if (!AGGREGATION_STATISTICS.includes(statistic)) {
+                throw new Error(`aggregation-statistic must be one of ${AGGREGATION_STATISTICS.join(', ')}`);
+            }
+            aggregationStatistic = statistic;
+        }
     }
     
     // Execute the configure function
@@ -54,6 +98,11 @@ export const RightSizingModel = (params: ConfigParams): PluginInterface => {
     const execute = async (inputs: PluginParams[]) => {
         let outputs: PluginParams[] = [];
 
+        // With an aggregation window, the observations of each instance in a window are reduced to one input
+        if (aggregationWindow !== undefined) {
+            inputs = aggregateInputs(inputs, aggregationWindow, aggregationStatistic);
+        }
+
         // Process each input
         for (const input of inputs) {
             // Check if 'cloud-vendor' key exists in input
@@ -61,27 +110,53 @@ export const RightSizingModel = (params: ConfigParams): PluginInterface => {
                 const cloudVendor = input['cloud-vendor'];
                 // Check if database for the cloud vendor is cached
                 if (!Cache.has(cloudVendor)) {
-                    // If not cached, create a new database instance and load model data for the specific cloud vendor
-                    const newDatabase = new CPUDatabase();
-                    if (cloudVendor === 'aws') {
-                        console.log("path: " + builtinDataPath);
-                        await newDatabase.loadModelData(path.resolve(builtinDataPath + '/aws-instances.json'));
-                    } else if (cloudVendor === 'azure') {
-                        await newDatabase.loadModelData(path.resolve(builtinDataPath + '/azure-instances.json'));
-                    }
-                    Cache.set(cloudVendor, newDatabase); // Cache the loaded database
+                    // If not cached, get the database of the cloud vendor, which is loaded once per process and shared by all the instances
+                    Cache.set(cloudVendor, await loadVendorDatabase(cloudVendor)); // Cache the loaded database
                 }
                 database = Cache.get(cloudVendor)!; // Set database to the cached one
+                databaseName = cloudVendor;
             }
 
             // Process input and collect processed outputs
             let processedOutputs = processInput(input);
             outputs.push(...processedOutputs); // Append processed outputs to the outputs array
         }
+        console.log('Right-sizing memo:', memo.stats());
 
         return Promise.resolve(outputs); // Resolve the promise with the outputs array
     }
 
+    /**
+     * Loads the built-in database of a cloud vendor.
+     * The database is shared by all the instances of the model in the process and must not be modified.
+     * 
+     * @param   cloudVendor The cloud vendor, 'aws' or 'azure' (other vendors get an empty database).
+     * @return  A Promise resolving to the database of the cloud vendor.
+     */
+    const loadVendorDatabase = (cloudVendor: string): Promise<CPUDatabase> => {
+        const dataFiles: { [vendor: string]: string } = { aws: 'aws-instances.json', azure: 'azure-instances.json' };
+        const dataFile = dataFiles[cloudVendor];
+        if (dataFile === undefined) {
+            return Promise.resolve(new CPUDatabase());
+        }
+        const dataPath = path.resolve(builtinDataPath, dataFile);
+        return loadStaticData(`right-sizing/instances:${dataPath}`, async () => {
+            // Prefer the catalog compiled by scripts/compile_instances.py, unless it is missing or stale
+            const compiledPath = dataPath.replace(/\.json$/, '.compiled.json');
+            try {
+                const compiledDatabase = new CPUDatabase();
+                const sourceHash = crypto.createHash('sha256').update(await fsPromises.readFile(dataPath)).digest('hex');
+                await compiledDatabase.loadCompiled(compiledPath, sourceHash);
+                return compiledDatabase;
+            } catch (error) {
+                console.log(`Compiled catalog ${compiledPath} not used: ${(error as Error).message}`);
+            }
+            const jsonDatabase = new CPUDatabase();
+            await jsonDatabase.loadModelData(dataPath);
+            return jsonDatabase;
+        });
+    }
+
     /**
      * Processes a single input to generate multiple outputs, each representing a different instance combination.
      * @param input The input parameters for the model.
@@ -105,7 +180,7 @@ export const RightSizingModel = (params: ConfigParams): PluginInterface => {
             let util: number;
             let targetUtil: number;
             let res: InstanceData[];
-            let originalMemUtil = input['mem-util'];
+            let originalMemUtil = quantiseUtil(input['mem-util']);
             let targetRAM = (originalMemUtil / 100) * instance.RAM;
             let region = input['location'];
 
@@ -118,7 +193,7 @@ export const RightSizingModel = (params: ConfigParams): PluginInterface => {
             } else {
                 throw new Error('cpu-util must be a number or string');
             }
-            util = util / 100; // Convert percentage to decimal
+            util = quantiseUtil(util) / 100; // Convert percentage to decimal
 
             // Set target CPU utilization to 100 if not defined
             if (typeof input['target-cpu-util'] === 'undefined') {
@@ -136,7 +211,7 @@ export const RightSizingModel = (params: ConfigParams): PluginInterface => {
             targetUtil = targetUtil / 100; // Convert percentage to decimal
 
             // Calculate right sizing for the instance
-            res = calculateRightSizing(instance, util, targetUtil, targetRAM, originalMemUtil, region);
+            res = memoisedRightSizing(instance, util, targetUtil, targetRAM, originalMemUtil, region);
 
             // generate unique id to use for cases where many instances replace one
             let output_id = crypto.randomUUID();
@@ -176,6 +251,39 @@ export const RightSizingModel = (params: ConfigParams): PluginInterface => {
         return outputs;
     }
 
+    /**
+     * Rounds a utilisation percentage up to a multiple of util-quantum (at most 100), so that close observations share a result.
+     * Rounding up never sizes for less than the observed utilisation.
+     * 
+     * @param util The utilisation percentage.
+     * @returns The quantised utilisation percentage, or util itself if there is no quantisation.
+     */
+    const quantiseUtil = (util: number): number => {
+        if (utilQuantum <= 0 || typeof util !== 'number' || isNaN(util)) {
+            return util;
+        }
+        return Math.min(Math.ceil(fixFloat(util / utilQuantum, 9)) * utilQuantum, 100);
+    }
+
+    /**
+     * calculateRightSizing with the results of the recent searches kept in the memo.
+     * The result only depends on the instance, the region, the target util, the required vCPUs and the target RAM,
+     * so observations of the same instance with the same (or the same quantised) utilisation search once.
+     * 
+     * @returns A copy of the result, so that callers cannot change the memo.
+     */
+    const memoisedRightSizing = (cloudInstance: CloudInstance, cpuUtil: number, targetUtil: number,
+        targetRAM: number, originalMemUtil: number, region: string): InstanceData[] => {
+        const requiredvCPUs = cpuUtil * cloudInstance.vCPUs / targetUtil;
+        const key = [databaseName, cloudInstance.model, region, targetUtil, requiredvCPUs, targetRAM].join('|');
+        let result = memo.get(key);
+        if (result === undefined) {
+            result = calculateRightSizing(cloudInstance, cpuUtil, targetUtil, targetRAM, originalMemUtil, region);
+            memo.set(key, result);
+        }
+        return result.map(insData => ({ ...insData }));
+    }
+
     /**
      * Validate the input parameters object, check if the necessary parameters are present.
      * 
@@ -198,84 +306,104 @@ export const RightSizingModel = (params: ConfigParams): PluginInterface => {
     }
 
     /**
-     * Processes a single input to generate multiple outputs, each representing a different instance combination.
-     * @param index The current index in the family array.
+     * Orders two partial combinations of the same vCPUs and RAM: lower cost, then fewer instances, then the indexes
+     * of their instances in lexicographic order (the order in which a depth-first enumeration of the family finds them).
+     * @returns A negative number if a is better, a positive number if b is better, 0 if they are the same combination.
+     */
+    const compareCombinations = (a: CombinationState, b: CombinationState): number => {
+        const costA = fixFloat(a.cost, 5);
+        const costB = fixFloat(b.cost, 5);
+        if (costA !== costB) return costA - costB;
+        if (a.indexes.length !== b.indexes.length) return a.indexes.length - b.indexes.length;
+        for (let i = 0; i < a.indexes.length; i++) {
+            if (a.indexes[i] !== b.indexes[i]) return a.indexes[i] - b.indexes[i];
+        }
+        return 0;
+    }
+
+    /**
+     * Finds the best combination of instances of the family that fits in the RAM of the original instance
+     * and has at least the target RAM and the required vCPUs. The best combination has the fewest exceeding vCPUs,
+     * then the least RAM, then the lowest cost, then the fewest instances (and is the first one in the order of the family).
+     *
+     * Unbounded knapsack over (vCPUs, RAM) states: every state keeps its best combination by cost, length and order,
+     * and the instances are added in the order of the family so that every multiset of instances is built once.
+     * The number of states is bounded by the distinct (vCPUs, RAM) sums that fit in the original RAM,
+     * so time and memory do not grow exponentially with the size of the family or the required vCPUs.
      * @param family The sorted array of CloudInstance objects.
      * @param originalData With original cost, RAM size, required vCPUs, target cpu util, target RAM, region of the instance.
-     * @param optimalData The current optimal combination data.
-     * @param currentData The current state of the combination being evaluated.
      * @returns An object containing optimal combination details, closest CPU utilization difference, optimal RAM, and lowest cost.
      */
-    const findOptimalCombination = (index: number, family: CloudInstance[], 
-        originalData: OriginalData, optimalData: CombinationData, currentData: CurrentData): CombinationData => {
-            try {
-                // if index exceeds the length of the family array, return the current optimal data
-                if (index >= family.length) return { ...optimalData }
-                const instance = family[index];
-    
-                // Check if adding the current instance would exceed the RAM of original instance
-                // If it exceeds, try the next one (family has been sorted in descending order).
-                if (currentData.currentRAM + instance.RAM > originalData.originalRAM) {
-                    return findOptimalCombination(index + 1, family, originalData, optimalData, currentData);
-                }
-    
-                currentData.currentCPUs += instance.vCPUs;
-                currentData.currentRAM += instance.RAM;
-                currentData.currentCost += instance.getPrice(originalData.region);
-                currentData.combination.push(instance);
-    
-                // Check if the current combination meets the target requirements
-                if (currentData.currentRAM >= originalData.targetRAM && currentData.currentCPUs >= originalData.requiredvCPUs) {
-                    const currentExceededCPUs = fixFloat(currentData.currentCPUs - originalData.requiredvCPUs, 5)
-                    const currentRAM = fixFloat(currentData.currentRAM, 5);
-                    const currentCost = fixFloat(currentData.currentCost, 5);
-                    const currentLength = currentData.combination.length;
-    
-                    const optimalExceedCPU = fixFloat(optimalData.exceedCPUs, 5);
-                    const optimalRAM = fixFloat(optimalData.optimalRAM, 5);
-                    const lowestCost = fixFloat(optimalData.lowestCost, 5);
-                    const optimalLength = optimalData.optimalCombination.length;
-    
-                    // Update optimal combination if the current combination is better
-                    if (currentExceededCPUs < optimalExceedCPU ||
-                        (currentExceededCPUs === optimalExceedCPU && currentRAM < optimalRAM) ||
-                        (currentExceededCPUs === optimalExceedCPU && currentRAM === optimalRAM && currentData.currentCost < lowestCost) ||
-                        (currentExceededCPUs === optimalExceedCPU && currentRAM === optimalRAM && currentCost === lowestCost && currentLength < optimalLength)) {
-                        optimalData.exceedCPUs = currentExceededCPUs;
-                        optimalData.optimalRAM = currentRAM;
-                        optimalData.lowestCost = currentCost;
-                        let totalCPUUtil = (originalData.requiredvCPUs / currentData.currentCPUs);
-                        let totalMemUtil = (originalData.targetRAM / currentData.currentRAM);
-                        // Update optimal combination array
-                        optimalData.optimalCombination = currentData.combination.map((instance: CloudInstance) => {
-                            return {
-                                instance: instance,
-                                cpuUtil: totalCPUUtil,
-                                memUtil: totalMemUtil,
-                                price: instance.getPrice(originalData.region),
-                                priceDifference: 0
-                            }
-                        });
+    const findOptimalCombination = (family: CloudInstance[], originalData: OriginalData): CombinationData => {
+        const stateKey = (cpus: number, ram: number) => `${cpus}:${fixFloat(ram, 5)}`;
+        const empty: CombinationState = { cpus: 0, ram: 0, cost: 0, indexes: [] };
+        const states: Map<string, CombinationState> = new Map([[stateKey(0, 0), empty]]);
+
+        family.forEach((instance, index) => {
+            const price = instance.getPrice(originalData.region);
+            // Add the instance again to every state that improved, until no state that fits in the RAM improves
+            let improved: CombinationState[] = [...states.values()];
+            while (improved.length > 0) {
+                const next: Map<string, CombinationState> = new Map();
+                for (const state of improved) {
+                    const ram = state.ram + instance.RAM;
+                    if (ram > originalData.originalRAM) continue;
+                    const candidate: CombinationState = {
+                        cpus: state.cpus + instance.vCPUs,
+                        ram: ram,
+                        cost: state.cost + price,
+                        indexes: [...state.indexes, index]
+                    };
+                    const key = stateKey(candidate.cpus, candidate.ram);
+                    const current = states.get(key);
+                    if (current === undefined || compareCombinations(candidate, current) < 0) {
+                        states.set(key, candidate);
+                        next.set(key, candidate);
                     }
                 }
-    
-                // Include the instance and recurse
-                optimalData = findOptimalCombination(index, family, originalData, optimalData, currentData);
-    
-                // Backtrack: Exclude the current instance and recurse
-                currentData.currentCPUs -= instance.vCPUs;
-                currentData.currentRAM -= instance.RAM;
-                currentData.currentCost -= instance.getPrice(originalData.region);
-                currentData.combination.pop();
-    
-                // Exclude the instance and recurse
-                optimalData = findOptimalCombination(index + 1, family, originalData, optimalData, currentData);
-            } catch (err) {
-                throw (err)
+                improved = [...next.values()];
             }
-            // Return the final optimal combination details
-            return { ...optimalData };
+        });
+
+        // Pick the best state that meets the target requirements
+        let best: CombinationState | undefined = undefined;
+        let bestExceed = Number.MAX_VALUE;
+        let bestRAM = Number.MAX_VALUE;
+        for (const state of states.values()) {
+            if (state.indexes.length === 0) continue;
+            if (state.ram < originalData.targetRAM || state.cpus < originalData.requiredvCPUs) continue;
+            const exceed = fixFloat(state.cpus - originalData.requiredvCPUs, 5);
+            const ram = fixFloat(state.ram, 5);
+            if (best === undefined || exceed < bestExceed ||
+                (exceed === bestExceed && ram < bestRAM) ||
+                (exceed === bestExceed && ram === bestRAM && compareCombinations(state, best) < 0)) {
+                best = state;
+                bestExceed = exceed;
+                bestRAM = ram;
+            }
+        }
+
+        if (best === undefined) {
+            return { optimalCombination: [], exceedCPUs: Number.MAX_VALUE, optimalRAM: Number.MAX_VALUE, lowestCost: Number.MAX_VALUE };
         }
+        let totalCPUUtil = (originalData.requiredvCPUs / best.cpus);
+        let totalMemUtil = (originalData.targetRAM / best.ram);
+        return {
+            exceedCPUs: bestExceed,
+            optimalRAM: bestRAM,
+            lowestCost: fixFloat(best.cost, 5),
+            optimalCombination: best.indexes.map(index => {
+                const instance = family[index];
+                return {
+                    instance: instance,
+                    cpuUtil: totalCPUUtil,
+                    memUtil: totalMemUtil,
+                    price: instance.getPrice(originalData.region),
+                    priceDifference: 0
+                }
+            })
+        };
+    }
 
     /**
      * @param cloudInstance The original cloud instance to be analyzed.
@@ -294,8 +422,8 @@ export const RightSizingModel = (params: ConfigParams): PluginInterface => {
             throw new Error(`Invalid cloud instance: ${cloudInstance}`);
         }
 
-        // Retrieve the model family of the cloud instance
-        let family = database.getModelFamily(cloudInstance.model);
+        // Retrieve the model family of the cloud instance, sorted in descending order based on RAM size
+        let family = database.getSortedModelFamily(cloudInstance.model);
         // If no model family is found, return the original instance
         if (!family || family.length === 0) {
             return [{
@@ -307,10 +435,7 @@ export const RightSizingModel = (params: ConfigParams): PluginInterface => {
             }];
         }
 
-        // Sort family in descending order based on RAM size
-        family.sort((a, b) => b.RAM - a.RAM);
-
-        // Prepare parameters for recursive findOptimalCombination.
+        // Prepare parameters for findOptimalCombination.
         // original cost, RAM size, required vCPUs, target cpu util, target RAM, region of the instance
         let originalData: OriginalData = {
             originalCost: cloudInstance.getPrice(region),
@@ -320,24 +445,9 @@ export const RightSizingModel = (params: ConfigParams): PluginInterface => {
             targetRAM: targetRAM,
             region: region
         }
-        // Initialize an object to store the optimal data with default values
-        let optimalCombination: InstanceData[] = [];
-        let optimalData: CombinationData = {
-            optimalCombination: optimalCombination,
-            exceedCPUs: Number.MAX_VALUE,
-            optimalRAM: Number.MAX_VALUE,
-            lowestCost: Number.MAX_VALUE
-        }
-        // Initialize variables for the current state of the combination being evaluated
-        let currentData: CurrentData = {
-            combination: [],
-            currentCPUs: 0,
-            currentRAM: 0,
-            currentCost: 0
-        }
-        // Start the recursive search for the optimal combination
-        let index = 0;
-        optimalData = findOptimalCombination(index, family, originalData, optimalData, currentData);
+        // Search the optimal combination
+        let optimalData: CombinationData = findOptimalCombination(family, originalData);
+        let optimalCombination: InstanceData[];
 
         // If an optimal combination is found
         optimalCombination = optimalData.optimalCombination;
@@ -377,9 +487,19 @@ export const RightSizingModel = (params: ConfigParams): PluginInterface => {
         return Cache;
     }
 
+    /**
+     * Get the hits, misses and hit rate of the memo of right-sizing results.
+     * 
+     * @returns The statistics of the memo
+     */
+    const getMemoStats = (): LruCacheStats => {
+        return memo.stats();
+    }
+
     return {
         metadata,
         execute,
-        getDatabases
+        getDatabases,
+        getMemoStats
     };
 }
\ No newline at end of file
@@ -3,6 +3,9 @@ import { ConfigParams, PluginParams } from "../../../types/common";
 import { PluginInterface } from "../../../interfaces";
 import axios from "axios";
 import MockAdapter from "axios-mock-adapter";
+import * as fs from "fs";
+import * as os from "os";
+import * as path from "path";
 import 'jest-expect-message';
 const mock = new MockAdapter(axios);
 
@@ -56,6 +59,24 @@ describe('CarbonAdvisorModel.Validation', () => {
         expect(supportedLocations).toContain("ca-west-1");
     });
 
+    it('CarbonAdvisorModel.Validation.SupportedLocationsShared', async () => {
+        const config: ConfigParams = {
+            "allowed-locations": ["eastus"],
+            "allowed-timeframes": ["2024-01-15T12:00:00Z - 2024-01-15T18:00:00Z"]
+        };
+        const inputs: PluginParams[] = [{
+            "timestamp": "",
+            "duration": 1
+        }];
+        initMock(scenario1);
+        const first = CarbonAwareAdvisor(config);
+        const second = CarbonAwareAdvisor(config);
+        await first.execute(inputs);
+        await second.execute(inputs);
+        // locations.json is loaded once and its set is shared by the instances
+        expect(second.supportedLocations).toBe(first.supportedLocations);
+    });
+
     // Locations Validation
     it('CarbonAdvisorModel.Unit.UndefinedLocations', async () => {
         const config: ConfigParams = {
@@ -325,4 +346,201 @@ describe('CarbonAdvisorModel.Validation', () => {
         initMock(scenario1);
         await model.execute(inputs);
     });
-});
\ No newline at end of file
+
+    it('CarbonAdvisorModel.Unit.MaxConcurrentRequestsInvalid', async () => {
+        const config: ConfigParams = {
+            "allowed-locations": ["world_aws"],
+            'allowed-timeframes': ['2024-01-15T12:00:00Z - 2024-01-15T18:00:00Z'],
+            "max-concurrent-requests": 0
+        };
+        const inputs: PluginParams[] = [{
+            "timestamp": "",
+            "duration": 1
+        }];
+        const model = CarbonAwareAdvisor(config);
+        await expect(model.execute(inputs))
+            .rejects.toThrow("Parameter max-concurrent-requests must be a positive integer");
+    });
+
+    it('CarbonAdvisorModel.Unit.MaxConcurrentRequestsValid', async () => {
+        const config: ConfigParams = {
+            "allowed-locations": ["eastus", "westus"],
+            'allowed-timeframes': ['2024-01-15T12:00:00Z - 2024-01-15T18:00:00Z', '2024-01-16T12:00:00Z - 2024-01-16T18:00:00Z'],
+            "max-concurrent-requests": 2
+        };
+        const inputs: PluginParams[] = [{
+            "timestamp": "",
+            "duration": 1
+        }];
+        const model = CarbonAwareAdvisor(config);
+        mockAverage(model, 1);
+        initMock(scenario1);
+        const result = await model.execute(inputs);
+        expect(result[0].suggestions.length).toBeGreaterThan(0);
+    });
+
+    it('CarbonAdvisorModel.Unit.SamplingSeedReproducible', async () => {
+        const config: ConfigParams = {
+            "allowed-locations": ["eastus"],
+            'allowed-timeframes': ['2024-01-15T12:00:00Z - 2024-01-15T18:00:00Z'],
+            "sampling": 4,
+            "sampling-seed": 42
+        };
+        const inputs: PluginParams[] = [{
+            "timestamp": "",
+            "duration": 1
+        }];
+        initMock(scenario1);
+        const first = await CarbonAwareAdvisor(config).execute(inputs);
+        const second = await CarbonAwareAdvisor(config).execute(inputs);
+
+        const plottedPoints = first[0]['plotted-points'];
+        expect(plottedPoints.length).toBe(4);
+        expect(plottedPoints[0].rating).toBe(1);
+        // the sampled points are different and none of them is the best point again
+        expect(new Set(plottedPoints).size).toBe(4);
+        expect(plottedPoints.slice(1).every((point: any) => point.rating !== 1)).toBe(true);
+        expect(second[0]['plotted-points']).toEqual(plottedPoints);
+    });
+
+    it('CarbonAdvisorModel.Unit.SamplingSeedInvalid', async () => {
+        const config: ConfigParams = {
+            "allowed-locations": ["eastus"],
+            'allowed-timeframes': ['2024-01-15T12:00:00Z - 2024-01-15T18:00:00Z'],
+            "sampling": 4,
+            "sampling-seed": "abc"
+        };
+        const inputs: PluginParams[] = [{
+            "timestamp": "",
+            "duration": 1
+        }];
+        const model = CarbonAwareAdvisor(config);
+        await expect(model.execute(inputs))
+            .rejects.toThrow("Parameter sampling-seed must be an integer");
+    });
+
+    it('CarbonAdvisorModel.Unit.MaxRetriesInvalid', async () => {
+        const config: ConfigParams = {
+            "allowed-locations": ["eastus"],
+            'allowed-timeframes': ['2024-01-15T12:00:00Z - 2024-01-15T18:00:00Z'],
+            "max-retries": -1
+        };
+        const inputs: PluginParams[] = [{
+            "timestamp": "",
+            "duration": 1
+        }];
+        const model = CarbonAwareAdvisor(config);
+        await expect(model.execute(inputs))
+            .rejects.toThrow("Parameter max-retries must be a non-negative integer");
+    });
+
+    it('CarbonAdvisorModel.Unit.RetryAfterServiceUnavailable', async () => {
+        const config: ConfigParams = {
+            "allowed-locations": ["eastus"],
+            'allowed-timeframes': ['2024-01-15T12:00:00Z - 2024-01-15T18:00:00Z'],
+            "max-concurrent-requests": 1
+        };
+        const inputs: PluginParams[] = [{
+            "timestamp": "",
+            "duration": 1
+        }];
+        const model = CarbonAwareAdvisor(config);
+        mockAverage(model, 1);
+        mock.reset();
+        // the first request is rejected once and succeeds when it is retried
+        mock.onGet(new RegExp('/emissions/bylocations')).replyOnce(503)
+            .onGet(new RegExp('/emissions/bylocations')).reply(200, scenario1);
+        const results = await model.execute(inputs);
+        expect(results[0].suggestions.length).toBeGreaterThan(0);
+    });
+
+    it('CarbonAdvisorModel.Unit.NoRetryOnClientError', async () => {
+        const config: ConfigParams = {
+            "allowed-locations": ["eastus"],
+            'allowed-timeframes': ['2024-01-15T12:00:00Z - 2024-01-15T18:00:00Z'],
+            "max-concurrent-requests": 1
+        };
+        const inputs: PluginParams[] = [{
+            "timestamp": "",
+            "duration": 1
+        }];
+        const model = CarbonAwareAdvisor(config);
+        mockAverage(model, 1);
+        mock.reset();
+        mock.onGet(new RegExp('/emissions/bylocations')).replyOnce(400)
+            .onGet(new RegExp('/emissions/bylocations')).reply(200, scenario1);
+        await expect(model.execute(inputs)).rejects.toThrow("Request failed with status code 400");
+        initMock(scenario1);
+    });
+
+    it('CarbonAdvisorModel.Unit.DataPath', async () => {
+        const config: ConfigParams = {
+            "allowed-locations": ["eastus"],
+            'allowed-timeframes': ['2024-01-15T12:00:00Z - 2024-01-15T18:00:00Z'],
+            "data-path": path.join(__dirname, 'scenarios', 'scenario1.json')
+        };
+        const inputs: PluginParams[] = [{
+            "timestamp": "",
+            "duration": 1
+        }];
+        const model = CarbonAwareAdvisor(config);
+        // no request may reach the API, the data comes from the file
+        mock.reset();
+        const results = await model.execute(inputs);
+        expect(results[0].suggestions).toEqual([{
+            "location": "eastus",
+            "time": "2024-01-15T11:30:00+00:00",
+            "rating": 1,
+            "duration": "04:00:00"
+        }]);
+        initMock(scenario1);
+    });
+
+    it('CarbonAdvisorModel.Unit.WindowChunksMatchSingleRequest', async () => {
+        // hourly data points with the best one at 05:00, the last data point of the first 6 hour chunk
+        const data = Array.from({ length: 48 }, (_, hour) => ({
+            "location": "eastus",
+            "time": new Date(Date.UTC(2022, 0, 1, hour)).toISOString(),
+            "rating": hour === 29 ? 1 : 100 + hour % 7,
+            "duration": "01:00:00"
+        }));
+        const dataPath = path.join(fs.mkdtempSync(path.join(os.tmpdir(), 'carbon-advisor-')), 'emissions.json');
+        fs.writeFileSync(dataPath, JSON.stringify(data));
+        const inputs: PluginParams[] = [{
+            "timestamp": "",
+            "duration": 1
+        }];
+        const execute = (windowChunkHours: number) => CarbonAwareAdvisor({
+            "allowed-locations": ["eastus"],
+            'allowed-timeframes': ['2022-01-02T00:00:00Z - 2022-01-03T00:00:00Z'],
+            "data-path": dataPath,
+            "window-chunk-hours": windowChunkHours,
+            "sampling": 24,
+            "sampling-seed": 7
+        }).execute(inputs);
+        // the local data answers like the API, with the data points of [time - 1h, toTime - 1h)
+        mock.reset();
+        const single = await execute(0);
+        const chunked = await execute(6);
+        expect(single[0]['plotted-points'].length).toBe(24);
+        expect(chunked[0]['plotted-points']).toEqual(single[0]['plotted-points']);
+        expect(chunked[0].suggestions).toEqual([data[29]]);
+        expect(single[0].suggestions).toEqual([data[29]]);
+        initMock(scenario1);
+    });
+
+    it('CarbonAdvisorModel.Unit.DataPathNotFound', async () => {
+        const config: ConfigParams = {
+            "allowed-locations": ["eastus"],
+            'allowed-timeframes': ['2024-01-15T12:00:00Z - 2024-01-15T18:00:00Z'],
+            "data-path": "./missing-emissions.json"
+        };
+        const inputs: PluginParams[] = [{
+            "timestamp": "",
+            "duration": 1
+        }];
+        const model = CarbonAwareAdvisor(config);
+        await expect(model.execute(inputs))
+            .rejects.toThrow("Emissions data file ./missing-emissions.json not found");
+    });
+});
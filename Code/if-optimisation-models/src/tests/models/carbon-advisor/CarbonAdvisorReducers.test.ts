@@ -0,0 +1,34 @@
+import { MinRatingReducer } from "../../../lib/carbon-aware-advisor/reducers";
+
+/**
+* To run: npm run test -- src/tests/models/carbon-advisor/CarbonAdvisorReducers.test.ts
+*/
+
+describe('CarbonAdvisorModel.Reducers', () => {
+    it('CarbonAdvisorModel.Reducers.Empty', () => {
+        const reducer = new MinRatingReducer<{ rating: number }>();
+        expect(reducer.rating).toBe(Infinity);
+        expect(reducer.items).toEqual([]);
+    });
+
+    it('CarbonAdvisorModel.Reducers.KeepsTiesInOrder', () => {
+        const reducer = new MinRatingReducer<{ location: string, rating: number }>();
+        reducer.addAll([
+            { location: "eastus", rating: 5 },
+            { location: "westus", rating: 3 },
+            { location: "uksouth", rating: 4 },
+            { location: "northeurope", rating: 3 },
+        ]);
+        expect(reducer.rating).toBe(3);
+        expect(reducer.items.map(item => item.location)).toEqual(["westus", "northeurope"]);
+    });
+
+    it('CarbonAdvisorModel.Reducers.LargeInput', () => {
+        // Math.min(...items) would exceed the call stack with this many items
+        const items = Array.from({ length: 500000 }, (_, index) => ({ rating: 1000 - (index % 997) }));
+        const reducer = new MinRatingReducer<{ rating: number }>();
+        reducer.addAll(items);
+        expect(reducer.rating).toBe(4);
+        expect(reducer.items.length).toBe(items.filter(item => item.rating === 4).length);
+    });
+});
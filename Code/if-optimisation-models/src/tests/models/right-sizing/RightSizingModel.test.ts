@@ -2,6 +2,8 @@ import { RightSizingModel } from "../../../lib/right-sizing";
 import { CPUDatabase, CloudInstance } from "../../../lib/right-sizing/CPUFamily";
 import { PluginParams } from "../../../types/common";
 import { fixFloat } from "../../../util/util";
+import * as crypto from "crypto";
+import * as fs from "fs";
 
 import scenario1 = require('./scenarios/scenario1.json');
 import scenario2 = require('./scenarios/scenario2.json');
@@ -67,6 +69,33 @@ describe("CPUDatabase", () => {
         expect(family?.[0].model).toEqual('Test_2_8');
     });
 
+    it("CPUDatabase.loadCompiled", async () => {
+        const compiled = new CPUDatabase();
+        await compiled.loadCompiled('./src/lib/right-sizing/aws-instances.compiled.json');
+        const json = new CPUDatabase();
+        await json.loadModelData('./src/lib/right-sizing/aws-instances.json');
+
+        expect(compiled.getFamilies().size).toEqual(json.getFamilies().size);
+        const family = compiled.getSortedModelFamily('c5n.large');
+        expect(family?.map(instance => instance.model))
+        .toEqual(json.getSortedModelFamily('c5n.large')?.map(instance => instance.model));
+        expect(family?.[0].RAM).toBeGreaterThanOrEqual(family![family!.length - 1].RAM);
+        expect(compiled.getInstanceByModel('c5n.large')).toEqual(json.getInstanceByModel('c5n.large'));
+    });
+
+    it("CPUDatabase.loadCompiled (stale catalog)", async () => {
+        const source = fs.readFileSync('./src/lib/right-sizing/aws-instances.json');
+        const sourceHash = crypto.createHash('sha256').update(source).digest('hex');
+        await new CPUDatabase().loadCompiled('./src/lib/right-sizing/aws-instances.compiled.json', sourceHash);
+
+        // An edit that keeps the size of the catalog (a price from 0.12 to 0.13) still changes its hash
+        const edited = Buffer.from(source.toString('utf8').replace(/\d(?=,?\s*$)/m, digit => String((Number(digit) + 1) % 10)));
+        expect(edited.length).toEqual(source.length);
+        const editedHash = crypto.createHash('sha256').update(edited).digest('hex');
+        await expect(new CPUDatabase().loadCompiled('./src/lib/right-sizing/aws-instances.compiled.json', editedHash))
+        .rejects.toThrow('stale');
+    });
+
     it("CPUDatabase.getInstanceByModel", () => {
         const instance = db.getInstanceByModel('Test_4_16');
         expect(instance).toBeDefined();
@@ -382,5 +411,91 @@ describe("RightSizingModel", () => {
             
             expect(compareWithExpectedCombinedValues(ALG_TEST6_EXPECTED_OUTPUTS, outputs)).toBeTruthy();
         });
+
+        it ("Does the algorithm handle the large instances of a family?", async () => {
+            // Required cpu: 50% of 72 = 36
+            // Required memory: 50% of 192 = 96
+            // Fittest combination: c5n.9xlarge = 36, 96 (the smaller sizes have less than 96 GB for 36 vCPUs)
+            const inputs = [{
+                "timestamp": "2023-11-02T10:45:00.000Z",
+                "duration": 300,
+                "cloud-vendor": "aws",
+                "cpu-util": 50,
+                "mem-util": 50,
+                "location": "us-east-1",
+                "cloud-instance-type": "c5n.metal"
+            }];
+            const outputs = await model.execute(inputs);
+
+            expect(outputs.length).toEqual(1);
+            expect(outputs[0]['cloud-instance-type']).toEqual('c5n.9xlarge');
+        });
+
+        it ("Are repeated observations sized once?", async () => {
+            const memoModel = RightSizingModel({ "data-path": "./data/test-instances.json", "util-quantum": 5 });
+            const observation = {
+                "timestamp": "2023-11-02T10:50:00.000Z",
+                "duration": 300,
+                "cloud-vendor": "custom",
+                "cpu-util": 41,
+                "mem-util": 50,
+                "location": "uksouth",
+                "cloud-instance-type": "Test_4_16"
+            };
+            // 41% and 43% are both sized as 45% with a quantum of 5
+            const outputs = await memoModel.execute([observation, { ...observation, "cpu-util": 43 }]);
+
+            expect(memoModel.getMemoStats()).toMatchObject({ hits: 1, misses: 1, size: 1 });
+            expect(outputs[outputs.length - 1]['cloud-instance-type'])
+            .toEqual(outputs[0]['cloud-instance-type']);
+        });
+
+        it ("Are the observations of a window sized once?", async () => {
+            const windowModel = RightSizingModel({ "data-path": "./data/test-instances.json", "aggregation-window": 3600, "aggregation-statistic": "max" });
+            const observation = {
+                "timestamp": "2023-11-02T10:00:00.000Z",
+                "duration": 300,
+                "cloud-vendor": "custom",
+                "cpu-util": 20,
+                "mem-util": 30,
+                "location": "uksouth",
+                "cloud-instance-type": "Test_4_16"
+            };
+            const outputs = await windowModel.execute([
+                observation,
+                { ...observation, "timestamp": "2023-11-02T10:05:00.000Z", "cpu-util": 45 },
+                { ...observation, "timestamp": "2023-11-02T10:10:00.000Z", "mem-util": 40 },
+                { ...observation, "timestamp": "2023-11-02T11:00:00.000Z" }
+            ]);
+
+            // one group per hour, the first one sized with the maximum cpu-util and mem-util of its observations
+            const timestamps = [...new Set(outputs.map(output => output['timestamp']))];
+            expect(timestamps).toEqual(["2023-11-02T10:00:00.000Z", "2023-11-02T11:00:00.000Z"]);
+            const first = outputs.filter(output => output['timestamp'] === timestamps[0]);
+            expect(first[0]['old-cpu-util']).toEqual(45);
+            expect(first[0]['old-mem-util']).toEqual(40);
+            expect(first[0]['duration']).toEqual(900);
+        });
+
+        it ("Are the observations of a window sized with their 95th percentile by default?", async () => {
+            const windowModel = RightSizingModel({ "data-path": "./data/test-instances.json", "aggregation-window": 3600 });
+            // 20 observations of 3 minutes in the same hour, with the cpu-util 1 to 20 and the mem-util 11 to 30 out of order
+            const observations = Array.from({ length: 20 }, (_, i) => ({
+                "timestamp": new Date(Date.parse("2023-11-02T10:00:00.000Z") + i * 180 * 1000).toISOString(),
+                "duration": 180,
+                "cloud-vendor": "custom",
+                "cpu-util": (i * 7) % 20 + 1,
+                "mem-util": (i * 7) % 20 + 11,
+                "location": "uksouth",
+                "cloud-instance-type": "Test_4_16"
+            }));
+            const outputs = await windowModel.execute(observations);
+
+            // nearest-rank: the 19th of the 20 sorted values
+            expect([...new Set(outputs.map(output => output['timestamp']))]).toEqual(["2023-11-02T10:00:00.000Z"]);
+            expect(outputs[0]['old-cpu-util']).toEqual(19);
+            expect(outputs[0]['old-mem-util']).toEqual(29);
+            expect(outputs[0]['duration']).toEqual(3600);
+        });
     });
-});
\ No newline at end of file
+});
@@ -16,11 +16,11 @@ export interface CombinationData {
     optimalCombination: InstanceData[];
 }
 
-export interface CurrentData {
-    combination: CloudInstance[];
-    currentCPUs: number;
-    currentRAM: number;
-    currentCost: number;
+export interface CombinationState {
+    cpus: number;
+    ram: number;
+    cost: number;
+    indexes: number[];
 }
 
 export interface OriginalData {
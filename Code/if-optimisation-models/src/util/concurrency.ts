@@ -0,0 +1,40 @@
+/**
+ * Runs async functions with at most a fixed number of them in flight at any time.
+ */
+export type Limiter = <R>(fn: () => Promise<R>) => Promise<R>;
+
+/**
+ * Creates a limiter that runs the functions passed to it with at most `limit` calls in flight at any time,
+ * however deeply the callers are nested; the other calls wait in the order they were made.
+ * A rejection only rejects the promise of its own call and frees its slot like a result does.
+ * @param limit the maximum number of concurrent calls (at least 1)
+ * @returns the limiter, which resolves or rejects with the result of each function
+ */
+export const createLimiter = (limit: number): Limiter => {
+  const max = Math.max(1, limit);
+  const waiting: (() => void)[] = [];
+  let active = 0;
+
+  // A finished call hands its slot to the call that has waited longest
+  const release = (): void => {
+    const next = waiting.shift();
+    if (next !== undefined) {
+      next();
+    } else {
+      active--;
+    }
+  };
+
+  return async <R>(fn: () => Promise<R>): Promise<R> => {
+    if (active < max) {
+      active++;
+    } else {
+      await new Promise<void>(resolve => waiting.push(resolve));
+    }
+    try {
+      return await fn();
+    } finally {
+      release();
+    }
+  };
+};
@@ -0,0 +1,151 @@
+import axios, { AxiosError } from 'axios';
+import * as http from 'http';
+import * as https from 'https';
+
+/**
+ * Pooled HTTP transport for the Carbon Aware WebApi.
+ * All requests of a transport share keep-alive agents, so a run opens at most maxSockets connections to the API
+ * instead of one per request. Responses are requested compressed, every attempt has a timeout,
+ * and 429, 5xx and network errors are retried with exponential backoff and full jitter
+ * (or after the Retry-After delay of the response when there is one).
+ * Requests go through the default axios instance, so axios-mock-adapter still intercepts them in the tests.
+ */
+
+export type HttpTransportOptions = {
+  baseURL: string;
+  timeoutMs?: number;
+  maxRetries?: number;
+  baseDelayMs?: number;
+  maxDelayMs?: number;
+  maxSockets?: number;
+};
+
+export type HttpTransportMetrics = {
+  requests: number;
+  attempts: number;
+  retries: number;
+  failures: number;
+  totalLatencyMs: number;
+  maxLatencyMs: number;
+  statuses: { [status: string]: number };
+};
+
+const RETRYABLE_STATUSES = [429, 500, 502, 503, 504];
+
+/**
+ * Serializes arrays by repeating the key ('location=eastus&location=westus'), which is the format the API expects.
+ */
+export const serializeParams = (params: any): string =>
+  Object.entries(params ?? {}).map(([key, value]) => {
+    const values = Array.isArray(value) ? value : [value];
+    return values.map(v => `${encodeURIComponent(key)}=${encodeURIComponent(String(v))}`).join('&');
+  }).join('&');
+
+export class HttpTransport {
+  private readonly baseURL: string;
+  private readonly timeoutMs: number;
+  private readonly maxRetries: number;
+  private readonly baseDelayMs: number;
+  private readonly maxDelayMs: number;
+  private readonly httpAgent: http.Agent;
+  private readonly httpsAgent: https.Agent;
+  private counters: HttpTransportMetrics = {
+    requests: 0, attempts: 0, retries: 0, failures: 0, totalLatencyMs: 0, maxLatencyMs: 0, statuses: {}
+  };
+
+  constructor(options: HttpTransportOptions, private readonly random: () => number = Math.random) {
+    this.baseURL = options.baseURL;
+    this.timeoutMs = options.timeoutMs ?? 30 * 1000;
+    this.maxRetries = options.maxRetries ?? 3;
+    this.baseDelayMs = options.baseDelayMs ?? 200;
+    this.maxDelayMs = options.maxDelayMs ?? 10 * 1000;
+    const maxSockets = options.maxSockets ?? 8;
+    this.httpAgent = new http.Agent({ keepAlive: true, maxSockets });
+    this.httpsAgent = new https.Agent({ keepAlive: true, maxSockets });
+  }
+
+  /**
+   * Sends the request and returns the body of the response, retrying the retryable failures.
+   * @throws the error of the last attempt if the request did not succeed
+   */
+  public async request(route: string, method: string = 'GET', params: any = null): Promise<any> {
+    this.counters.requests++;
+    for (let attempt = 0; ; attempt++) {
+      this.counters.attempts++;
+      const start = Date.now();
+      try {
+        const response = await axios({
+          baseURL: this.baseURL,
+          url: route,
+          method,
+          params,
+          paramsSerializer: serializeParams,
+          timeout: this.timeoutMs,
+          httpAgent: this.httpAgent,
+          httpsAgent: this.httpsAgent,
+          headers: { 'Accept-Encoding': 'gzip, deflate, br' },
+        });
+        this.record(start, response.status);
+        return response.data;
+      } catch (error) {
+        const status = axios.isAxiosError(error) ? error.response?.status : undefined;
+        this.record(start, status ?? 'error');
+        if (attempt >= this.maxRetries || !this.isRetryable(error)) {
+          this.counters.failures++;
+          throw error;
+        }
+        this.counters.retries++;
+        const delay = this.retryDelay(attempt, error as AxiosError);
+        console.warn(`${method} ${route} failed (${status ?? (error as Error).message}), retry ${attempt + 1} of ${this.maxRetries} in ${delay} ms`);
+        await new Promise(resolve => setTimeout(resolve, delay));
+      }
+    }
+  }
+
+  private record(start: number, status: number | string): void {
+    const latency = Date.now() - start;
+    this.counters.totalLatencyMs += latency;
+    this.counters.maxLatencyMs = Math.max(this.counters.maxLatencyMs, latency);
+    this.counters.statuses[status] = (this.counters.statuses[status] ?? 0) + 1;
+  }
+
+  /**
+   * Network errors and timeouts (no response) and the statuses in RETRYABLE_STATUSES are worth another attempt.
+   */
+  private isRetryable(error: any): boolean {
+    if (!axios.isAxiosError(error)) {
+      return false;
+    }
+    return error.response === undefined || RETRYABLE_STATUSES.includes(error.response.status);
+  }
+
+  /**
+   * Full jitter: a random delay up to baseDelayMs * 2^attempt (at most maxDelayMs),
+   * or the Retry-After delay of the response if it asks for one.
+   */
+  private retryDelay(attempt: number, error: AxiosError): number {
+    const retryAfter = Number(error.response?.headers?.['retry-after']);
+    if (!isNaN(retryAfter) && retryAfter >= 0) {
+      return Math.min(retryAfter * 1000, this.maxDelayMs);
+    }
+    const cap = Math.min(this.maxDelayMs, this.baseDelayMs * 2 ** attempt);
+    return Math.floor(this.random() * cap);
+  }
+
+  public metrics(): HttpTransportMetrics & { meanLatencyMs: number | null } {
+    const { attempts, totalLatencyMs } = this.counters;
+    return {
+      ...this.counters,
+      statuses: { ...this.counters.statuses },
+      meanLatencyMs: attempts > 0 ? totalLatencyMs / attempts : null,
+    };
+  }
+
+  /**
+   * Closes the idle pooled connections, so that the process can exit without waiting for them to time out.
+   */
+  public close(): void {
+    this.httpAgent.destroy();
+    this.httpsAgent.destroy();
+  }
+}
@@ -0,0 +1,57 @@
+export type LruCacheStats = {
+  size: number;
+  hits: number;
+  misses: number;
+  evictions: number;
+  hitRate: number | null;
+};
+
+/**
+ * In-memory cache of at most maxEntries values that drops the least recently used value when it is full.
+ * A Map keeps its keys in insertion order, so a value is moved to the end on every use and the first key is the oldest.
+ */
+export class LruCache<K, V> {
+  private readonly entries: Map<K, V> = new Map();
+  private counters = { hits: 0, misses: 0, evictions: 0 };
+
+  constructor(private readonly maxEntries: number) { }
+
+  /**
+   * Returns the value of `key` and marks it as recently used, or undefined on a miss.
+   */
+  public get(key: K): V | undefined {
+    const value = this.entries.get(key);
+    if (value === undefined) {
+      this.counters.misses++;
+      return undefined;
+    }
+    this.entries.delete(key);
+    this.entries.set(key, value);
+    this.counters.hits++;
+    return value;
+  }
+
+  /**
+   * Stores the value of `key`, dropping the least recently used values above maxEntries.
+   */
+  public set(key: K, value: V): void {
+    if (this.maxEntries <= 0) {
+      return;
+    }
+    this.entries.delete(key);
+    this.entries.set(key, value);
+    while (this.entries.size > this.maxEntries) {
+      this.entries.delete(this.entries.keys().next().value as K);
+      this.counters.evictions++;
+    }
+  }
+
+  public clear(): void {
+    this.entries.clear();
+  }
+
+  public stats(): LruCacheStats {
+    const lookups = this.counters.hits + this.counters.misses;
+    return { size: this.entries.size, ...this.counters, hitRate: lookups > 0 ? this.counters.hits / lookups : null };
+  }
+}
@@ -0,0 +1,249 @@
+import { createHash } from 'crypto';
+import { promises as fsPromises } from 'fs';
+import * as path from 'path';
+
+/**
+ * Content-addressed on-disk cache of Carbon Aware WebApi responses.
+ * Files are shared with the Python tools (Code/carbon-aware-webapi/response_cache.py), so both must build
+ * the same canonical request:
+ *   base URL (scheme://host[:port][/path], lower case scheme and host, without default port or trailing slash)
+ *   + route (lower case, without trailing slash) + '?' + the query pairs sorted by name (values keep their order),
+ *   percent-encoded with encodeURIComponent; time and toTime are rewritten as YYYY-MM-DDTHH:MM:SS.sssZ.
+ * The base URL keeps the responses of different servers (the WebApi, local_webapi.py, ...) apart.
+ * An entry is <directory>/<sha[:2]>/<sha>.json holding {key, stored_at, expires_at, body} (times in epoch seconds).
+ * Windows that ended more than settleSeconds ago never expire, more recent ones expire after recentTtl seconds.
+ * The modification time of an entry is its last use; least recently used entries are removed above maxBytes.
+ */
+
+export const CACHE_DIR_ENV = 'CARBON_AWARE_CACHE_DIR';
+
+const TIME_PARAMS = ['time', 'toTime'];
+
+export type ResponseCacheOptions = {
+  maxBytes?: number;
+  recentTtl?: number;
+  settleSeconds?: number;
+};
+
+export type ResponseCacheStats = {
+  hits: number;
+  misses: number;
+  stores: number;
+  expired: number;
+  evictions: number;
+  hitRate: number | null;
+};
+
+type CacheEntry = {
+  key: string;
+  stored_at: number;
+  expires_at: number | null;
+  body: any;
+};
+
+/**
+ * Parses a time of the API, taking times without an offset as UTC like the Python tools do.
+ */
+const parseTime = (value: string): number => {
+  const hasOffset = /([zZ]|[+-]\d\d:?\d\d)$/.test(value);
+  return Date.parse(hasOffset || !value.includes('T') ? value : `${value}Z`);
+};
+
+const canonicalTime = (value: any): string => {
+  const time = parseTime(String(value));
+  return isNaN(time) ? String(value) : new Date(time).toISOString();
+};
+
+/**
+ * Normalised form of the server a request is sent to.
+ */
+export const canonicalBaseURL = (baseURL: string): string => {
+  let url: URL;
+  try {
+    url = new URL(baseURL);
+  } catch (error) {
+    return baseURL.replace(/\/+$/, '').toLowerCase();
+  }
+  if (url.hostname === '') {
+    return baseURL.replace(/\/+$/, '').toLowerCase();
+  }
+  return `${url.protocol}//${url.host}${url.pathname.replace(/\/+$/, '')}`;
+};
+
+/**
+ * Normalised form of a request; two requests with the same canonical form get the same response.
+ */
+export const canonicalRequest = (baseURL: string, route: string, params: Record<string, any> | null = null): string => {
+  const pairs: string[] = [];
+  Object.keys(params ?? {}).sort().forEach(name => {
+    const value = params![name];
+    const values = Array.isArray(value) ? value : [value];
+    values.forEach(v => {
+      const normalised = TIME_PARAMS.includes(name) ? canonicalTime(v) : String(v);
+      pairs.push(`${encodeURIComponent(name)}=${encodeURIComponent(normalised)}`);
+    });
+  });
+  const normalisedRoute = '/' + route.replace(/^\/+|\/+$/g, '').toLowerCase();
+  return canonicalBaseURL(baseURL) + normalisedRoute + (pairs.length > 0 ? '?' + pairs.join('&') : '');
+};
+
+export const cacheKey = (baseURL: string, route: string, params: Record<string, any> | null = null): string =>
+  createHash('sha256').update(canonicalRequest(baseURL, route, params), 'utf8').digest('hex');
+
+export class ResponseCache {
+  private readonly maxBytes: number;
+  private readonly recentTtl: number;
+  private readonly settleSeconds: number;
+  private size: number | null = null;
+  private counters = { hits: 0, misses: 0, stores: 0, expired: 0, evictions: 0 };
+
+  constructor(private readonly directory: string, options: ResponseCacheOptions = {}) {
+    this.maxBytes = options.maxBytes ?? 512 * 1024 * 1024;
+    this.recentTtl = options.recentTtl ?? 10 * 60;
+    this.settleSeconds = options.settleSeconds ?? 24 * 60 * 60;
+  }
+
+  /**
+   * The cache in $CARBON_AWARE_CACHE_DIR or in `directory` if given, undefined when neither is set.
+   */
+  public static fromConfig(directory?: string): ResponseCache | undefined {
+    const cacheDir = directory ?? process.env[CACHE_DIR_ENV];
+    return cacheDir ? new ResponseCache(cacheDir) : undefined;
+  }
+
+  private entryPath(key: string): string {
+    return path.join(this.directory, key.slice(0, 2), `${key}.json`);
+  }
+
+  /**
+   * null when the requested window is settled, otherwise the time at which the entry expires.
+   */
+  private expiresAt(params: Record<string, any> | null): number | null {
+    const now = Date.now() / 1000;
+    let toTime = params?.toTime;
+    if (Array.isArray(toTime)) {
+      toTime = toTime[0];
+    }
+    if (toTime !== undefined && toTime !== null) {
+      const end = parseTime(String(toTime));
+      if (!isNaN(end) && end / 1000 <= now - this.settleSeconds) {
+        return null;
+      }
+    }
+    return now + this.recentTtl;
+  }
+
+  /**
+   * Returns the cached body of the request to `baseURL`, or undefined on a miss.
+   */
+  public async get(baseURL: string, route: string, params: Record<string, any> | null = null): Promise<any> {
+    const file = this.entryPath(cacheKey(baseURL, route, params));
+    let entry: CacheEntry;
+    try {
+      entry = JSON.parse(await fsPromises.readFile(file, 'utf-8'));
+    } catch (error) {
+      this.counters.misses++;
+      return undefined;
+    }
+    if (entry.expires_at !== null && entry.expires_at <= Date.now() / 1000) {
+      this.counters.expired++;
+      this.counters.misses++;
+      await this.remove(file);
+      return undefined;
+    }
+    // Mark the entry as recently used for the LRU eviction
+    const now = new Date();
+    await fsPromises.utimes(file, now, now).catch(() => undefined);
+    this.counters.hits++;
+    return entry.body;
+  }
+
+  /**
+   * Stores the body of a successful request to `baseURL`.
+   */
+  public async put(baseURL: string, route: string, params: Record<string, any> | null, body: any): Promise<void> {
+    const key = cacheKey(baseURL, route, params);
+    const file = this.entryPath(key);
+    const entry: CacheEntry = {
+      key: canonicalRequest(baseURL, route, params),
+      stored_at: Date.now() / 1000,
+      expires_at: this.expiresAt(params),
+      body,
+    };
+    const data = JSON.stringify(entry);
+    const tempFile = `${file}.${process.pid}.tmp`;
+    await fsPromises.mkdir(path.dirname(file), { recursive: true });
+    await fsPromises.writeFile(tempFile, data, 'utf-8');
+    // An entry that is overwritten no longer counts towards the size
+    const replaced = await fsPromises.stat(file).catch(() => undefined);
+    await fsPromises.rename(tempFile, file);
+    this.counters.stores++;
+    if (this.size !== null) {
+      this.size += Buffer.byteLength(data) - (replaced?.size ?? 0);
+    }
+    if (await this.totalSize() > this.maxBytes) {
+      await this.evict();
+    }
+  }
+
+  private async entries(): Promise<{ file: string, mtime: number, size: number }[]> {
+    const result: { file: string, mtime: number, size: number }[] = [];
+    let shards: string[];
+    try {
+      shards = await fsPromises.readdir(this.directory);
+    } catch (error) {
+      return result;
+    }
+    for (const shard of shards) {
+      const shardPath = path.join(this.directory, shard);
+      const names = await fsPromises.readdir(shardPath).catch(() => [] as string[]);
+      for (const name of names.filter(name => name.endsWith('.json'))) {
+        const file = path.join(shardPath, name);
+        const stat = await fsPromises.stat(file).catch(() => undefined);
+        if (stat) {
+          result.push({ file, mtime: stat.mtimeMs, size: stat.size });
+        }
+      }
+    }
+    return result;
+  }
+
+  private async remove(file: string): Promise<void> {
+    const stat = await fsPromises.stat(file).catch(() => undefined);
+    if (!stat) {
+      return;
+    }
+    await fsPromises.unlink(file).catch(() => undefined);
+    if (this.size !== null) {
+      this.size -= stat.size;
+    }
+  }
+
+  private async totalSize(): Promise<number> {
+    if (this.size === null) {
+      this.size = (await this.entries()).reduce((total, entry) => total + entry.size, 0);
+    }
+    return this.size;
+  }
+
+  /**
+   * Removes the least recently used entries until the cache is at most 90% of maxBytes.
+   */
+  public async evict(): Promise<void> {
+    const target = Math.floor(this.maxBytes * 0.9);
+    const entries = (await this.entries()).sort((a, b) => a.mtime - b.mtime);
+    this.size = entries.reduce((total, entry) => total + entry.size, 0);
+    for (const entry of entries) {
+      if (this.size <= target) {
+        break;
+      }
+      await this.remove(entry.file);
+      this.counters.evictions++;
+    }
+  }
+
+  public stats(): ResponseCacheStats {
+    const lookups = this.counters.hits + this.counters.misses;
+    return { ...this.counters, hitRate: lookups > 0 ? this.counters.hits / lookups : null };
+  }
+}
@@ -0,0 +1,31 @@
+/**
+ * Process-wide registry of the static datasets of the plugins (locations.json, the instance catalogs, ...).
+ * Every dataset is loaded once, on its first use, and the same copy is then shared by all the plugin instances
+ * of the process, so a manifest with many instances of a plugin does not read and parse the same files again.
+ * The shared values must be treated as read-only.
+ */
+
+const registry: Map<string, Promise<any>> = new Map();
+
+/**
+ * Returns the dataset registered as `key`, loading it with `loader` the first time.
+ * Concurrent callers share the same load, and a failed load is forgotten so that the next call tries again.
+ * @param key the name of the dataset, usually including the path of its file
+ * @param loader loads the dataset
+ */
+export const loadStaticData = <T>(key: string, loader: () => Promise<T>): Promise<T> => {
+  let data = registry.get(key) as Promise<T> | undefined;
+  if (data === undefined) {
+    data = loader();
+    registry.set(key, data);
+    data.catch(() => registry.delete(key));
+  }
+  return data;
+};
+
+/**
+ * Forgets all the loaded datasets, for example after their files have changed.
+ */
+export const clearStaticData = (): void => {
+  registry.clear();
+};
@@ -1,24 +1,35 @@
+import argparse
+import os
+import sys
 import yaml
 import json
 import requests
-import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'Code', 'carbon-aware-webapi'))
+from response_cache import CACHE_DIR_ENV, ResponseCache, cached_get
+
+DEFAULT_URL = "http://localhost:5073/emissions/bylocations/best"
 
 # Function to make an API call and return the best timeframe, location, and carbon emission results
-def get_best_per_timeframe(start_time, finish_time, regions_list):
-    url = "http://localhost:5073/emissions/bylocations/best"
+# With a response_cache.ResponseCache, a request answered before is not sent again
+def get_best_per_timeframe(start_time, finish_time, regions_list, session=None, url=DEFAULT_URL, verbose=True, cache=None):
     params = {
         'location': regions_list,
         'time': start_time,
         'toTime': finish_time
     }
-    print(params)  # Debugging: Print the parameters for the request
-    response = requests.get(url, params=params)
-    
-    if response.status_code == 200:
-        data = json.loads(response.text)
-        return data
-    else:
-        raise ValueError(f"Request failed with status code: {response.status_code}")
+    if verbose:
+        print(params)  # Debugging: Print the parameters for the request
+    parsed_url = urlparse(url)
+    base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
+    try:
+        return cached_get(session or requests, base_url, parsed_url.path, params, cache)
+    except requests.HTTPError as error:
+        raise ValueError(f"Request failed with status code: {error.response.status_code}")
 
 # Function to parse a timestamp string into start and end times
 def parse_timestamp(timestamp):
@@ -69,27 +80,90 @@ def find_items_with_lowest_rating(data):
 
     return lowest_rating_items
 
-if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python script.py <input_file_path>")
-        sys.exit(1)
+def _parse_time(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+# Function to merge overlapping or adjacent timeframes, so every instant is asked for only once
+def merge_timeframes(timestamps):
+    merged = []
+    for start, finish in sorted(timestamps, key=lambda timeframe: _parse_time(timeframe[0])):
+        if merged and _parse_time(start) <= _parse_time(merged[-1][1]):
+            if _parse_time(finish) > _parse_time(merged[-1][1]):
+                merged[-1][1] = finish
+        else:
+            merged.append([start, finish])
+    return [tuple(timeframe) for timeframe in merged]
+
+class LowestRating:
+    """
+    Keeps the items with the lowest rating while results arrive in any order. Every item is kept once, and the
+    result is ordered by timeframe and then by position in the response, so it does not depend on arrival order.
+    """
+
+    def __init__(self):
+        self.rating = float('inf')
+        self.items = {}
+
+    def add(self, timeframe_index, items):
+        for position, item in enumerate(items):
+            rating = item.get('rating', float('inf'))
+            if rating < self.rating:
+                self.rating = rating
+                self.items = {}
+            if rating == self.rating:
+                self.items.setdefault((item['location'], item['time']), ((timeframe_index, position), item))
+
+    def result(self):
+        return [item for _, item in sorted(self.items.values(), key=lambda entry: entry[0])]
+
+# Function to query all the timeframes concurrently over one pooled session and reduce the results as they arrive
+def get_best_concurrent(timestamps, regions_list, workers=8, url=DEFAULT_URL, cache=None):
+    timeframes = merge_timeframes(timestamps)
+    lowest = LowestRating()
+    with requests.Session() as session:
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(get_best_per_timeframe, start, finish, regions_list, session, url, False, cache): index
+                       for index, (start, finish) in enumerate(timeframes)}
+            for future in as_completed(futures):
+                lowest.add(futures[future], future.result())
+    return lowest.result()
 
-    input_file_path = sys.argv[1]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(usage="python get_best_per_timeframe.py <input_file_path> [--concurrent [--workers N]]")
+    parser.add_argument("input_file_path")
+    parser.add_argument("--concurrent", action="store_true",
+                        help="merge overlapping or adjacent timeframes and send the requests concurrently")
+    parser.add_argument("--workers", type=int, default=8, help="requests in flight with --concurrent (default: %(default)s)")
+    parser.add_argument("--url", default=DEFAULT_URL, help="best emissions route of the WebApi (default: %(default)s)")
+    parser.add_argument("--cache-dir", default=os.environ.get(CACHE_DIR_ENV),
+                        help=f"reuse API responses stored in this directory (default: ${CACHE_DIR_ENV}, no cache when unset)")
+    args = parser.parse_args()
+    cache = ResponseCache(args.cache_dir) if args.cache_dir else None
+
+    input_file_path = args.input_file_path
     output_file_path = input_file_path.rsplit('.', 1)[0] + "_ompl." + input_file_path.rsplit('.', 1)[1]
 
     with open(input_file_path, 'r') as file:
         data = yaml.safe_load(file)
 
-    all_data = []
     timestamps, regions = read_yaml_file(data)
 
-    for start_time, finish_time in timestamps:
-        all_data.extend(get_best_per_timeframe(start_time, finish_time, regions))
+    if args.concurrent:
+        lowest_rating_items = get_best_concurrent(timestamps, regions, args.workers, args.url, cache)
+    else:
+        all_data = []
+        for start_time, finish_time in timestamps:
+            all_data.extend(get_best_per_timeframe(start_time, finish_time, regions, url=args.url, cache=cache))
 
-    print("\nFinal Result:")
-    print(all_data)
+        print("\nFinal Result:")
+        print(all_data)
 
-    lowest_rating_items = find_items_with_lowest_rating(all_data)
+        lowest_rating_items = find_items_with_lowest_rating(all_data)
+    if cache is not None:
+        print("Response cache:", cache.stats())
     print("Items with the lowest rating:")
     for item in lowest_rating_items:
         print(item)
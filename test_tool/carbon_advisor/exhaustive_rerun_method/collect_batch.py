@@ -0,0 +1,76 @@
+import csv
+import json
+import sys
+
+import yaml
+
+from create_batch import BATCH_CHILD_PREFIX
+
+# Turns the ompl of a batch run (create_batch.py + execute_batch.sh) into one results table with a row per
+# combination: index, timestamp, region and the metric. select_best.py reads this table directly.
+
+try:
+    Loader = yaml.CSafeLoader
+except AttributeError:
+    Loader = yaml.SafeLoader
+
+
+def last_metric_value(data, metric):
+    """
+    Return the last numeric `metric` value in document order, like select_best.py does for a single output file.
+    """
+    last = None
+    if isinstance(data, list):
+        for item in data:
+            value = last_metric_value(item, metric)
+            if value is not None:
+                last = value
+    elif isinstance(data, dict):
+        for key, value in data.items():
+            if str(key).lower() == metric and isinstance(value, (int, float)) and not isinstance(value, bool):
+                last = value
+            elif isinstance(value, (list, dict)):
+                value = last_metric_value(value, metric)
+                if value is not None:
+                    last = value
+    return last
+
+
+def collect_results(ompl_path, combinations, metric='aggregated-carbon'):
+    """
+    Return one row per combination of the batch, in index order. Combinations without the metric are left out.
+    """
+    with open(ompl_path, 'r') as file:
+        ompl = yaml.load(file, Loader=Loader)
+    rows = []
+    for name, child in ompl['graph']['children'].items():
+        if not name.startswith(BATCH_CHILD_PREFIX):
+            continue
+        index = int(name[len(BATCH_CHILD_PREFIX):])
+        value = last_metric_value(child, metric)
+        if value is not None:
+            time, location = combinations[index]
+            rows.append({'index': index, 'timestamp': time, 'region': location, metric: value})
+    return sorted(rows, key=lambda row: row['index'])
+
+
+def write_results(rows, output_path, metric='aggregated-carbon'):
+    with open(output_path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=['index', 'timestamp', 'region', metric])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+# Example usage
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python collect_batch.py <batch_ompl_file_path> [<results_file_path>]")
+        sys.exit(1)
+
+    output_path = sys.argv[2] if len(sys.argv) == 3 else "results.csv"
+    with open('data.json', 'r') as file:
+        combinations = json.load(file)
+
+    rows = collect_results(sys.argv[1], combinations)
+    write_results(rows, output_path)
+    print(f"Wrote {len(rows)} of {len(combinations)} combinations to {output_path}")
@@ -0,0 +1,57 @@
+import copy
+import json
+import sys
+from itertools import product
+
+import ruamel.yaml
+import yaml
+
+from create_combos import read_yaml_file, update_yaml_time_location, write_list_elements_with_indexes_to_file
+
+# Builds ONE impl file that evaluates every (timestamp, region) combination, so the impact engine is started,
+# and its models are loaded, a single time instead of once per combination (see execute_batch.sh).
+# Every combination becomes a child node `combo-<index>` of the batch graph holding a copy of the template's
+# children with 'timestamp' and 'region' replaced. The indexes are the same as in data.json and combos.txt.
+
+BATCH_CHILD_PREFIX = "combo-"
+
+
+def build_batch(template, combinations):
+    """
+    Return a copy of the `template` impl whose graph has one child per combination.
+    """
+    batch = copy.deepcopy(template)
+    template_children = template['graph']['children']
+    children = {}
+    for index, (time, location) in enumerate(combinations):
+        combo_children = copy.deepcopy(template_children)
+        update_yaml_time_location(combo_children, time, location)
+        children[f"{BATCH_CHILD_PREFIX}{index}"] = {'children': combo_children}
+    batch['graph']['children'] = children
+    return batch
+
+
+# Example usage
+if __name__ == "__main__":
+    if len(sys.argv) not in (3, 4):
+        print("Usage: python create_batch.py <allowed_locations_times_file_path> <impl_file_path> [<batch_impl_file_path>]")
+        sys.exit(1)
+
+    allowed_file_path = sys.argv[1]
+    input_file_path = sys.argv[2]
+    batch_file_path = sys.argv[3] if len(sys.argv) == 4 else "batch.yml"
+
+    with open(allowed_file_path, 'r') as file:
+        timestamps, regions = read_yaml_file(yaml.safe_load(file))
+    all_combinations = list(product(timestamps, regions))
+
+    with open('data.json', 'w') as file:
+        json.dump(all_combinations, file)
+    write_list_elements_with_indexes_to_file(all_combinations, "combos.txt")
+
+    with open(input_file_path, 'r') as file:
+        template = ruamel.yaml.YAML(typ='safe', pure=True).load(file)
+
+    with open(batch_file_path, 'w') as file:
+        ruamel.yaml.YAML().dump(build_batch(template, all_combinations), file)
+    print(f"Wrote {len(all_combinations)} combinations to {batch_file_path}")
@@ -5,6 +5,7 @@ import ruamel.yaml
 from ruamel.yaml.comments import CommentedMap, CommentedSeq
 import json
 import sys
+import argparse
 
 
 
@@ -77,6 +78,72 @@ def update_yaml_time_location(data, new_time, new_location):
         for item in data:
             update_yaml_time_location(item, new_time, new_location)
 
+def iter_timestamps(timestamps_lists):
+    # Lazy version of parse_timestamp over all the allowed timeframes, one hourly timestamp at a time
+    for timestamp in timestamps_lists:
+        if ' - ' not in timestamp:
+            raise ValueError(f"Error: timestamp format is not correct {timestamp}")
+        start, end = map(str.strip, timestamp.split(' - '))
+        current_time = datetime.strptime(start, '%Y-%m-%dT%H:%M:%SZ')
+        end_time = datetime.strptime(end, '%Y-%m-%dT%H:%M:%SZ')
+        while current_time <= end_time:
+            yield current_time.strftime('%Y-%m-%dT%H:%M:%SZ')
+            current_time += timedelta(hours=1)
+
+def iter_combinations(data):
+    """
+    Yield the (timestamp, region) combinations of the allowed timeframes and locations in the same order as
+    product(timestamps, regions), without building the list.
+    """
+    regions = list(recursive_search_for_key(data, 'allowed-locations'))
+    for time in iter_timestamps(recursive_search_for_key(data, 'allowed-timeframes')):
+        for location in regions:
+            yield time, location
+
+def compile_template(data, paths=None):
+    """
+    Find once where 'timestamp' and 'region' are in the YAML data, so every combination only sets those values.
+
+    :return: list of (container, key, field) where field is 'timestamp' or 'region'.
+    """
+    if paths is None:
+        paths = []
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if key in ('timestamp', 'region'):
+                paths.append((data, key, key))
+            else:
+                compile_template(value, paths)
+    elif isinstance(data, list):
+        for item in data:
+            compile_template(item, paths)
+    return paths
+
+def apply_template(paths, new_time, new_location):
+    # Same result as update_yaml_time_location on the data the paths were compiled from
+    for container, key, field in paths:
+        container[key] = new_time if field == 'timestamp' else new_location
+
+def stream_combinations(allowed_data, yaml_data, output_pattern='inputs/updated_yaml_file_{}.yaml'):
+    """
+    Write one input file per combination as the combinations are generated, together with data.json and combos.txt.
+    Memory and time per combination do not depend on the number of combinations.
+    """
+    paths = compile_template(yaml_data)
+    dumper = ruamel.yaml.YAML()
+    count = 0
+    with open('data.json', 'w') as data_file, open('combos.txt', 'w') as combos_file:
+        data_file.write('[')
+        for index, (time, location) in enumerate(iter_combinations(allowed_data)):
+            data_file.write((', ' if index else '') + json.dumps([time, location]))
+            combos_file.write(f"Combination {index}:\n\t{time}\n\t{location}\n")
+            apply_template(paths, time, location)
+            with open(output_pattern.format(index), 'w') as file:
+                dumper.dump(yaml_data, file)
+            count += 1
+        data_file.write(']')
+    return count
+
 def write_list_elements_with_indexes_to_file(input_list, output_file):
     with open(output_file, 'w') as file:
         for index, element in enumerate(input_list):
@@ -91,14 +158,25 @@ def write_list_elements_with_indexes_to_file(input_list, output_file):
                 file.write(f"Index {index}: {element}\n")
 # Example usage
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python script.py <allowed_locations_times_file_path> <impl_file_path>")
-        sys.exit(1)
-
-    input_file_path = sys.argv[2]
-    allowed_file_path=sys.argv[1]
+    parser = argparse.ArgumentParser(usage="python create_combos.py <allowed_locations_times_file_path> <impl_file_path> [--stream]")
+    parser.add_argument("allowed_file_path")
+    parser.add_argument("input_file_path")
+    parser.add_argument("--stream", action="store_true",
+                        help="generate the combinations lazily and write every input file directly, without printing them")
+    args = parser.parse_args()
+
+    input_file_path = args.input_file_path
+    allowed_file_path = args.allowed_file_path
     with open(allowed_file_path, 'r') as file:
         data = yaml.safe_load(file)
+
+    if args.stream:
+        with open(input_file_path, 'r') as file:
+            yaml_data = ruamel.yaml.YAML(typ='safe', pure=True).load(file)
+        count = stream_combinations(data, yaml_data)
+        print(f"Wrote {count} combinations")
+        sys.exit(0)
+
     #print(data)
     timestamps, regions = read_yaml_file(data)
     print(timestamps)
@@ -1,7 +1,7 @@
 #!/bin/bash
 
 # Set the source directory relative to the script location
-python3 "create_combos.py" "enhanced.yml" "template.yml" # find all possible combos of regiosna nd times
+python3 "create_combos.py" "enhanced.yml" "template.yml" --stream # find all possible combos of regiosna nd times
 source_dir="inputs"
 rm -rf "outputs"
 # Set the destination directory relative to the script location
@@ -0,0 +1,21 @@
+#!/bin/bash
+
+# Same search as execute.sh, but every combination is evaluated by a single impact engine run:
+# create_batch.py writes one impl with a child per combination, collect_batch.py turns its ompl into results.csv
+python3 "create_batch.py" "enhanced.yml" "template.yml" "batch.yml" # find all possible combos of regions and times
+
+script_dir=$(dirname "$(readlink -f "$0")")
+
+cp "$script_dir/batch.yml" "../../../Code/if-optimisation-models/examples/batch.yml"
+cd "../../../Code/if-optimisation-models"
+nvm use 18.17.1
+npm install
+npm run install2if:local
+npm run if:local -- --impl examples/batch.yml --ompl examples/batch_ompl.yml
+cp "examples/batch_ompl.yml" "$script_dir/batch_ompl.yml"
+rm "examples/batch.yml"
+rm "examples/batch_ompl.yml"
+
+cd "$script_dir"
+python3 "collect_batch.py" "batch_ompl.yml" "results.csv"
+python3 "select_best.py" "results.csv"
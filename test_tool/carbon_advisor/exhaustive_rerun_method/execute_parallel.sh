@@ -0,0 +1,18 @@
+#!/bin/bash
+
+# Same search as execute.sh, but the combinations are run N at a time, each worker in its own scratch directory.
+# Run it again after an interruption and it continues with the combinations that have not finished yet.
+# Usage: ./execute_parallel.sh [workers]
+script_dir=$(dirname "$(readlink -f "$0")")
+cd "$script_dir"
+
+python3 "create_combos.py" "enhanced.yml" "template.yml" --stream # find all possible combos of regions and times
+
+cd "../../../Code/if-optimisation-models"
+nvm use 18.17.1
+npm install
+npm run install2if:local
+
+cd "$script_dir"
+python3 "run_parallel.py" --inputs "inputs" --outputs "outputs" ${1:+--workers "$1"}
+python3 "select_best.py"
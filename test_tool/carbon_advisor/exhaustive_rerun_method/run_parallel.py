@@ -0,0 +1,156 @@
+import argparse
+import hashlib
+import os
+import queue
+import shlex
+import shutil
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Runs the impact engine on the generated input files N at a time. Every worker has its own scratch directory
+# inside the IF checkout (examples/scratch/worker-<n>), so concurrent runs never share examples/inputs or
+# examples/outputs. Finished files are recorded in outputs/completed.txt with the SHA-256 of their input, and skipped
+# when the sweep is restarted only if their input file still has that content, so regenerating the inputs (a new
+# enhanced.yml or new combinations) never reuses the output of another combination.
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_IF_DIR = os.path.join(SCRIPT_DIR, '..', '..', '..', 'Code', 'if-optimisation-models')
+DEFAULT_COMMAND = "npm run if:local --"
+COMPLETED_FILE = 'completed.txt'
+
+
+class ParallelRunner:
+    """
+    Runs input files through the impact engine with `workers` concurrent processes.
+    Output files are moved into `outputs_dir` only once the run has succeeded, so an output file is always complete.
+    """
+
+    def __init__(self, if_dir=DEFAULT_IF_DIR, inputs_dir='inputs', outputs_dir='outputs', workers=None, command=DEFAULT_COMMAND):
+        self.if_dir = os.path.abspath(if_dir)
+        self.inputs_dir = os.path.abspath(inputs_dir)
+        self.outputs_dir = os.path.abspath(outputs_dir)
+        self.workers = workers or os.cpu_count() or 1
+        self.command = shlex.split(command)
+        self.completed_path = os.path.join(self.outputs_dir, COMPLETED_FILE)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def input_hash(content):
+        return hashlib.sha256(content).hexdigest()
+
+    def completed(self, file_names):
+        """
+        The names of `file_names` whose output is still there and was produced from the current content of their input.
+        """
+        recorded = {}
+        if os.path.exists(self.completed_path):
+            with open(self.completed_path, 'r') as file:
+                for line in file:
+                    # "<file name>\t<sha256 of the input>", the last run of a file wins; lines without a hash are ignored
+                    name, _, digest = line.strip().partition("\t")
+                    if digest:
+                        recorded[name] = digest
+        done = set()
+        for name in file_names:
+            if name not in recorded or not os.path.exists(os.path.join(self.outputs_dir, name)):
+                continue
+            with open(os.path.join(self.inputs_dir, name), 'rb') as file:
+                if self.input_hash(file.read()) == recorded[name]:
+                    done.add(name)
+        return done
+
+    def _record(self, file_name, digest):
+        with self._lock, open(self.completed_path, 'a') as file:
+            file.write(f"{file_name}\t{digest}\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+    def _run_one(self, file_name, scratch_dirs):
+        scratch = scratch_dirs.get()
+        try:
+            impl = os.path.join(scratch, file_name)
+            ompl = os.path.join(scratch, "ompl_" + file_name)
+            with open(os.path.join(self.inputs_dir, file_name), 'rb') as file:
+                content = file.read()
+            with open(impl, 'wb') as file:
+                file.write(content)
+            process = subprocess.run(
+                self.command + ["--impl", os.path.relpath(impl, self.if_dir), "--ompl", os.path.relpath(ompl, self.if_dir)],
+                cwd=self.if_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+            with open(os.path.join(scratch, "log.txt"), 'a') as log:
+                log.write(f"==> {file_name} (exit code {process.returncode})\n{process.stdout}\n")
+            if process.returncode != 0 or not os.path.exists(ompl):
+                return False
+            shutil.copyfile(ompl, os.path.join(self.outputs_dir, file_name + ".tmp"))
+            os.replace(os.path.join(self.outputs_dir, file_name + ".tmp"), os.path.join(self.outputs_dir, file_name))
+            self._record(file_name, self.input_hash(content))
+            return True
+        finally:
+            for leftover in (os.path.join(scratch, file_name), os.path.join(scratch, "ompl_" + file_name)):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+            scratch_dirs.put(scratch)
+
+    def run(self, file_names, on_done=None):
+        """
+        Run `file_names` (names of files in `inputs_dir`), skipping those already completed from the same input.
+        :param on_done: optional callback(file_name, succeeded) called as every run finishes.
+        :return: list of the file names whose run failed.
+        """
+        os.makedirs(self.outputs_dir, exist_ok=True)
+        done = self.completed(file_names)
+        pending = [name for name in file_names if name not in done]
+
+        scratch_dirs = queue.Queue()
+        for worker in range(min(self.workers, max(1, len(pending)))):
+            scratch = os.path.join(self.if_dir, 'examples', 'scratch', f'worker-{worker}')
+            os.makedirs(scratch, exist_ok=True)
+            scratch_dirs.put(scratch)
+
+        failed = []
+        with ThreadPoolExecutor(max_workers=scratch_dirs.qsize()) as pool:
+            futures = {name: pool.submit(self._run_one, name, scratch_dirs) for name in pending}
+            for name, future in futures.items():
+                succeeded = future.result()
+                if not succeeded:
+                    failed.append(name)
+                if on_done:
+                    on_done(name, succeeded)
+        return failed
+
+
+def input_files(inputs_dir):
+    # Generated input files in index order
+    names = [name for name in os.listdir(inputs_dir) if name.endswith(".yaml")]
+    return sorted(names, key=lambda name: int(''.join(filter(str.isdigit, name)) or 0))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the generated combinations through the impact engine in parallel.")
+    parser.add_argument("--if-dir", default=DEFAULT_IF_DIR, help="if-optimisation-models checkout (default: %(default)s)")
+    parser.add_argument("--inputs", default="inputs", help="directory of the generated input files (default: %(default)s)")
+    parser.add_argument("--outputs", default="outputs", help="directory for the output files (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=None, help="concurrent impact engine runs (default: number of CPUs)")
+    parser.add_argument("--command", default=DEFAULT_COMMAND, help="impact engine command run in the IF checkout (default: %(default)s)")
+    parser.add_argument("--restart", action="store_true", help=f"forget {COMPLETED_FILE} and run every combination again")
+    args = parser.parse_args()
+
+    runner = ParallelRunner(args.if_dir, args.inputs, args.outputs, args.workers, args.command)
+    if args.restart and os.path.exists(runner.completed_path):
+        os.remove(runner.completed_path)
+
+    names = input_files(args.inputs)
+    already_done = len(runner.completed(names))
+    finished = [already_done]
+
+    def report(name, succeeded):
+        finished[0] += 1
+        print(f"[{finished[0]}/{len(names)}] {name} {'done' if succeeded else 'FAILED'}")
+
+    print(f"{len(names)} combinations, {already_done} already done, {runner.workers} workers")
+    failed = runner.run(names, report)
+    if failed:
+        print(f"{len(failed)} combinations failed, see examples/scratch/worker-*/log.txt in the IF checkout: {failed}")
+        sys.exit(1)
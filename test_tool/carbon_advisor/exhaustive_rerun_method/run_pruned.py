@@ -0,0 +1,188 @@
+import argparse
+import json
+import os
+import sys
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+import requests
+import ruamel.yaml
+import yaml
+
+from create_combos import apply_template, compile_template, iter_combinations, recursive_search_for_key
+from run_parallel import COMPLETED_FILE, DEFAULT_COMMAND, DEFAULT_IF_DIR, ParallelRunner
+from select_best import RunningMinimum, parse_output
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'Code', 'carbon-aware-webapi'))
+from response_cache import CACHE_DIR_ENV, ResponseCache, cached_get
+
+# Hybrid of the API method and the exhaustive method: every (timestamp, region) combination is first ranked by its
+# carbon intensity rating from /emissions/bylocations, then the full pipeline is run only where it can still matter.
+#
+# The pipeline's carbon grows with the grid intensity when everything else in the impl is the same, so a combination
+# can not beat an evaluated one with a lower or equal rating and a higher carbon. Its lower bound is therefore the
+# highest carbon of the evaluated combinations whose rating is not above its own, and it is only run while that bound
+# is <= the best carbon so far (<= keeps ties). If the evaluated results contradict that ordering, every remaining
+# combination is run, so the answer is always the one of the full enumeration.
+#
+# Outputs of an earlier run in the same --outputs directory are reused only when they were produced from an input file
+# with the same content (see ParallelRunner.completed), so a stale run directory can not change the answer either.
+
+DEFAULT_URL = "http://localhost:5073"
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+def _parse_time(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+
+
+def fetch_ratings(url, allowed_data, combinations, session=None, cache=None):
+    """
+    Mean rating of every combination's hour [timestamp, timestamp + 1h) at its region, None when the API has no data.
+    One request per allowed timeframe covers all regions; `cache` is an optional response_cache.ResponseCache.
+    """
+    session = session or requests.Session()
+    regions = list(recursive_search_for_key(allowed_data, 'allowed-locations'))
+    sums = defaultdict(lambda: [0.0, 0])
+    for timeframe in recursive_search_for_key(allowed_data, 'allowed-timeframes'):
+        start, end = map(str.strip, timeframe.split(' - '))
+        # The last hour of the timeframe is a combination too, so ask for one more hour
+        to_time = (_parse_time(end) + timedelta(hours=1)).strftime(TIME_FORMAT)
+        params = {'location': regions, 'time': start, 'toTime': to_time}
+        for item in cached_get(session, url, "/emissions/bylocations", params, cache):
+            hour = _parse_time(item['time']).replace(minute=0, second=0, microsecond=0).strftime(TIME_FORMAT)
+            bucket = sums[(hour, item['location'])]
+            bucket[0] += item['rating']
+            bucket[1] += 1
+    ratings = []
+    for time, location in combinations:
+        total, count = sums.get((time, location), (0.0, 0))
+        ratings.append(total / count if count else None)
+    return ratings
+
+
+class PrunedSearch:
+    """
+    Decides which combinations still need a full pipeline run, given their ratings and the carbon of the runs so far.
+    """
+
+    def __init__(self, ratings):
+        self.ratings = ratings
+        # Lowest rating first; combinations without a rating can not be bounded and come last
+        self.order = sorted(range(len(ratings)), key=lambda index: (ratings[index] is None, ratings[index] or 0, index))
+        self.carbon = {}
+        self.monotone = True
+
+    def add(self, index, carbon):
+        self.carbon[index] = carbon
+
+    def best(self):
+        minimum = RunningMinimum()
+        for index in sorted(self.carbon):
+            if self.carbon[index] is not None:
+                minimum.add(index, self.carbon[index])
+        return minimum
+
+    def _evaluated_by_rating(self):
+        return sorted((self.ratings[index], carbon) for index, carbon in self.carbon.items()
+                      if carbon is not None and self.ratings[index] is not None)
+
+    def _check_monotone(self):
+        # With the combinations ordered by rating, and by carbon from high to low for equal ratings,
+        # the carbon must never go down
+        evaluated = sorted(self._evaluated_by_rating(), key=lambda item: (item[0], -item[1]))
+        return all(previous[1] <= current[1] for previous, current in zip(evaluated, evaluated[1:]))
+
+    def _lower_bounds(self):
+        """
+        Return a function giving the lower bound of a combination: the highest carbon of the evaluated
+        combinations with a rating <= its rating, -inf when there are none or its rating is unknown.
+        """
+        evaluated = self._evaluated_by_rating()
+        ratings = [rating for rating, _ in evaluated]
+        highest = list(accumulate((carbon for _, carbon in evaluated), max))
+
+        def lower_bound(index):
+            rating = self.ratings[index]
+            position = bisect_right(ratings, rating) if rating is not None else 0
+            return highest[position - 1] if position else float('-inf')
+        return lower_bound
+
+    def candidates(self):
+        """
+        Combinations not evaluated yet whose lower bound could still reach the best carbon, lowest rating first.
+        """
+        if self.monotone and not self._check_monotone():
+            print("Ratings and carbon are not in the same order, pruning is disabled")
+            self.monotone = False
+        remaining = [index for index in self.order if index not in self.carbon]
+        best = self.best().value
+        if not self.monotone or best is None:
+            return remaining
+        lower_bound = self._lower_bounds()
+        return [index for index in remaining if lower_bound(index) <= best]
+
+
+def write_input(template_paths, yaml_data, combination, inputs_dir, index, dumper):
+    apply_template(template_paths, *combination)
+    file_name = f'updated_yaml_file_{index}.yaml'
+    with open(os.path.join(inputs_dir, file_name), 'w') as file:
+        dumper.dump(yaml_data, file)
+    return file_name
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exhaustive search that only runs the combinations the API ratings can not rule out.")
+    parser.add_argument("allowed_file_path", help="impl with allowed-locations and allowed-timeframes, e.g. enhanced.yml")
+    parser.add_argument("impl_file_path", help="template impl whose timestamp and region are replaced, e.g. template.yml")
+    parser.add_argument("--top-k", type=int, default=None, help="combinations run first, lowest rating first (default: --workers)")
+    parser.add_argument("--url", default=DEFAULT_URL, help="Carbon Aware WebApi (default: %(default)s)")
+    parser.add_argument("--metric", default="aggregated-carbon")
+    parser.add_argument("--if-dir", default=DEFAULT_IF_DIR)
+    parser.add_argument("--inputs", default="inputs")
+    parser.add_argument("--outputs", default="outputs")
+    parser.add_argument("--workers", type=int, default=None, help="concurrent impact engine runs (default: number of CPUs)")
+    parser.add_argument("--command", default=DEFAULT_COMMAND)
+    parser.add_argument("--cache-dir", default=os.environ.get(CACHE_DIR_ENV), help=f"API response cache (default: ${CACHE_DIR_ENV})")
+    parser.add_argument("--restart", action="store_true", help=f"forget {COMPLETED_FILE} and run every candidate again")
+    args = parser.parse_args()
+
+    with open(args.allowed_file_path, 'r') as file:
+        allowed_data = yaml.safe_load(file)
+    with open(args.impl_file_path, 'r') as file:
+        yaml_data = ruamel.yaml.YAML(typ='safe', pure=True).load(file)
+
+    combinations = [list(combination) for combination in iter_combinations(allowed_data)]
+    with open('data.json', 'w') as file:
+        json.dump(combinations, file)
+    cache = ResponseCache(args.cache_dir) if args.cache_dir else None
+    search = PrunedSearch(fetch_ratings(args.url, allowed_data, combinations, cache=cache))
+
+    os.makedirs(args.inputs, exist_ok=True)
+    runner = ParallelRunner(args.if_dir, args.inputs, args.outputs, args.workers, args.command)
+    if args.restart and os.path.exists(runner.completed_path):
+        os.remove(runner.completed_path)
+    template_paths = compile_template(yaml_data)
+    dumper = ruamel.yaml.YAML()
+    batch_size = args.top_k or runner.workers
+
+    candidates = search.candidates()
+    while candidates:
+        batch = candidates[:batch_size]
+        batch_size = runner.workers
+        names = {write_input(template_paths, yaml_data, combinations[index], args.inputs, index, dumper): index for index in batch}
+        failed = runner.run(list(names))
+        if failed:
+            print(f"{len(failed)} combinations failed, see examples/scratch/worker-*/log.txt in the IF checkout: {failed}")
+            sys.exit(1)
+        for name, index in names.items():
+            search.add(index, parse_output(os.path.join(args.outputs, name), args.metric))
+        candidates = search.candidates()
+
+    best = search.best()
+    print(f"Ran the pipeline for {len(search.carbon)} of {len(combinations)} combinations")
+    print(best.indexes)
+    for item in best.indexes:
+        print(f"The best combo is {item} with value {best.value} and with specification {combinations[item]}")
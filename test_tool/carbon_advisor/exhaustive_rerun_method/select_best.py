@@ -1,7 +1,18 @@
-from ruamel.yaml.comments import CommentedSeq, CommentedMap
+import argparse
+import csv
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor
+
 import yaml
-import json
+
+# The C loader is several times faster than the pure-Python one; outputs only contain plain YAML
+try:
+    Loader = yaml.CSafeLoader
+except AttributeError:
+    Loader = yaml.SafeLoader
+
+CACHE_FILE = 'select_best_cache.json'
 
 
 def find_best(data, metric):
@@ -17,20 +28,102 @@ def find_best(data, metric):
         return result
     return []
 
-def process_yaml_files(directory, metric):
-    result = {}
-    for filename in os.listdir(directory):
-        if filename.endswith(".yaml"):
-            file_path = os.path.join(directory, filename)
-            with open(file_path, 'r') as file:
-                yaml_data = yaml.load(file, Loader=yaml.Loader)
-                processed_data = find_best(yaml_data, metric)
-
-                if processed_data:
-                    file_number = extract_number_from_filename(filename)
-                    if file_number is not None:
-                        result[file_number] = processed_data[-1]
-    return result
+
+def parse_output(file_path, metric):
+    # Last value of the metric in the output file, or None when it has none
+    with open(file_path, 'r') as file:
+        values = find_best(yaml.load(file, Loader=Loader), metric)
+    return values[-1] if values else None
+
+
+def _parse_output_task(task):
+    file_path, metric = task
+    return file_path, parse_output(file_path, metric)
+
+
+def load_cache(cache_path):
+    try:
+        with open(cache_path, 'r') as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_cache(cache, cache_path):
+    with open(cache_path + '.tmp', 'w') as file:
+        json.dump(cache, file)
+    os.replace(cache_path + '.tmp', cache_path)
+
+
+class RunningMinimum:
+    """
+    Keeps the lowest value seen so far and every index that has it.
+    """
+
+    def __init__(self):
+        self.value = None
+        self.indexes = []
+
+    def add(self, index, value):
+        if self.value is None or value < self.value:
+            self.value, self.indexes = value, [index]
+        elif value == self.value:
+            self.indexes.append(index)
+
+
+def process_yaml_files(directory, metric, workers=None, cache_path=CACHE_FILE):
+    """
+    Reduce the output files of `directory` to the lowest metric value and the indexes of the files that have it.
+    Files are parsed in parallel; a file whose size and mtime are unchanged since the last run is read from the cache.
+    """
+    cache = load_cache(cache_path) if cache_path else {}
+    minimum = RunningMinimum()
+    new_cache = {}
+    pending = []
+    for entry in os.scandir(directory):
+        if not entry.name.endswith(".yaml"):
+            continue
+        index = extract_number_from_filename(entry.name)
+        if index is None:
+            continue
+        stat = entry.stat()
+        key = f"{metric}:{os.path.abspath(entry.path)}"
+        cached = cache.get(key)
+        if cached is not None and cached[:2] == [stat.st_mtime_ns, stat.st_size]:
+            new_cache[key] = cached
+            if cached[2] is not None:
+                minimum.add(index, cached[2])
+        else:
+            pending.append((entry.path, index, key, [stat.st_mtime_ns, stat.st_size]))
+
+    if pending:
+        by_path = {path: (index, key, signature) for path, index, key, signature in pending}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            tasks = [(path, metric) for path in by_path]
+            for path, value in pool.map(_parse_output_task, tasks, chunksize=max(1, len(tasks) // 64)):
+                index, key, signature = by_path[path]
+                new_cache[key] = signature + [value]
+                if value is not None:
+                    minimum.add(index, value)
+
+    if cache_path:
+        save_cache(new_cache, cache_path)
+    minimum.indexes.sort()
+    return minimum
+
+
+def read_results_table(path, metric):
+    # Results table written by collect_batch.py: one row per combination with its index, timestamp, region and metric
+    minimum = RunningMinimum()
+    combinations = {}
+    with open(path, 'r', newline='') as file:
+        for row in csv.DictReader(file):
+            index = int(row['index'])
+            minimum.add(index, float(row[metric]))
+            combinations[index] = [row['timestamp'], row['region']]
+    minimum.indexes.sort()
+    return minimum, combinations
+
 
 def extract_number_from_filename(filename):
     # Extracts any number from the filename before the .yaml extension
@@ -38,40 +131,26 @@ def extract_number_from_filename(filename):
         return int(''.join(filter(str.isdigit, filename.split(".yaml")[0])))
     except ValueError:
         return None
-    
-
-def find_keys_with_min_value(my_dict):
-    if not my_dict:
-        return []
-
-    # Find the minimum value
-    min_value = min(my_dict.values())
-
-    # Find keys with the minimum value
-    keys_with_min_value = [key for key, value in my_dict.items() if value == min_value]
-
-    return keys_with_min_value
 
 
 # Example usage
-directory_path = './outputs'
-metric_name = 'aggregated-carbon'
-result = process_yaml_files(directory_path, metric_name)
-print(result)
-
-
-with open('data.json', 'r') as file:
-    loaded_data = json.load(file)
-
-# Convert the list to a dictionary with indices as keys
-loaded_dict = {index: item for index, item in enumerate(loaded_data)}
-
-# loaded_dict will be a dictionary with keys as indices
-print(loaded_dict)
-best_values_list= find_keys_with_min_value(result)
-print(best_values_list)
-for item in best_values_list:
-    best_value = result[item]
-    best_specification = loaded_dict[item]
-    print(f"The best combo is {item} with value {best_value} and with specification {best_specification}")
-
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Select the combination with the lowest aggregated carbon.")
+    parser.add_argument("results", nargs="?", help="results table of a batch run (collect_batch.py); default: parse ./outputs")
+    parser.add_argument("--outputs", default="./outputs", help="directory of the output files (default: %(default)s)")
+    parser.add_argument("--metric", default="aggregated-carbon", help="metric to minimise (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: number of CPUs)")
+    parser.add_argument("--no-cache", action="store_true", help=f"parse every file again and do not write {CACHE_FILE}")
+    args = parser.parse_args()
+
+    if args.results:
+        # Batch run: the results table already maps every index to its combination
+        best, loaded_dict = read_results_table(args.results, args.metric)
+    else:
+        best = process_yaml_files(args.outputs, args.metric, args.workers, None if args.no_cache else CACHE_FILE)
+        with open('data.json', 'r') as file:
+            loaded_dict = {index: item for index, item in enumerate(json.load(file))}
+
+    print(best.indexes)
+    for item in best.indexes:
+        print(f"The best combo is {item} with value {best.value} and with specification {loaded_dict[item]}")
@@ -0,0 +1,138 @@
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Latency and throughput benchmark for the emissions routes the carbon advisor depends on.
+# Sweeps number of locations x window length x concurrency against a base URL (the Carbon Aware SDK WebApi
+# or Code/carbon-aware-webapi/local_webapi.py) and reports p50/p95/p99 latency, throughput and error rate as JSON.
+
+DEFAULT_LOCATIONS_FILE = os.path.join(os.path.dirname(__file__), '..', '..', 'Code', 'carbon-aware-webapi', 'locations.json')
+ENDPOINTS = {
+    "bylocations": "/emissions/bylocations",
+    "best": "/emissions/bylocations/best",
+}
+
+
+def expand_locations(names, locations_file):
+    """
+    Expand region keywords (e.g. europe_azure) from locations.json into locations, keeping the order and removing duplicates.
+    """
+    with open(locations_file, 'r') as file:
+        keywords = json.load(file)
+    expanded = []
+    for name in names:
+        expanded.extend(keywords.get(name, [name]))
+    return list(dict.fromkeys(expanded))
+
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def run_cell(base_url, route, locations, window_hours, concurrency, num_requests, start, timeout):
+    """
+    Send `num_requests` requests for `locations` over `window_hours` windows with `concurrency` requests in flight.
+    Every request shifts its window by one hour so consecutive requests do not ask for the exact same data.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    def send(index):
+        window_start = start + timedelta(hours=index)
+        params = {
+            "location": locations,
+            "time": window_start.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            "toTime": (window_start + timedelta(hours=window_hours)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        }
+        sent = time.perf_counter()
+        try:
+            response = session.get(base_url + route, params=params, timeout=timeout)
+            ok = response.status_code == 200
+            size = len(response.content)
+        except requests.RequestException:
+            ok, size = False, 0
+        return time.perf_counter() - sent, ok, size
+
+    began = time.perf_counter()
+    with session, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(send, range(num_requests)))
+    elapsed = time.perf_counter() - began
+
+    latencies = sorted(latency * 1000 for latency, ok, _ in results if ok)
+    errors = sum(1 for _, ok, _ in results if not ok)
+    return {
+        "requests": num_requests,
+        "errors": errors,
+        "error_rate": errors / num_requests,
+        "throughput_rps": num_requests / elapsed if elapsed > 0 else None,
+        "latency_ms": {
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "mean": sum(latencies) / len(latencies) if latencies else None,
+            "max": latencies[-1] if latencies else None,
+        },
+        "mean_response_bytes": sum(size for _, ok, size in results if ok) / max(1, num_requests - errors),
+    }
+
+
+def int_list(value):
+    return [int(item) for item in value.split(',')]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark /emissions/bylocations and /emissions/bylocations/best.")
+    parser.add_argument("--base-url", default="http://localhost:5073", help="URL of the WebApi (default: %(default)s)")
+    parser.add_argument("--locations", default="europe_azure", help="comma separated locations or region keywords from locations.json (default: %(default)s)")
+    parser.add_argument("--locations-file", default=DEFAULT_LOCATIONS_FILE, help="locations.json used to expand region keywords")
+    parser.add_argument("--location-counts", type=int_list, default=[1, 2, 5, 10, 0], help="numbers of locations to sweep, 0 means all (default: 1,2,5,10,0)")
+    parser.add_argument("--windows", type=int_list, default=[1, 24, 168, 720], help="window lengths in hours (default: 1,24,168,720)")
+    parser.add_argument("--concurrency", type=int_list, default=[1, 4, 16], help="requests in flight (default: 1,4,16)")
+    parser.add_argument("--endpoints", default="bylocations,best", help="endpoints to benchmark: bylocations, best (default: %(default)s)")
+    parser.add_argument("--requests", type=int, default=50, help="requests per combination (default: %(default)s)")
+    parser.add_argument("--start", type=datetime.fromisoformat, default=datetime(2022, 5, 7, tzinfo=timezone.utc), help="start of the first window (default: 2022-05-07)")
+    parser.add_argument("--timeout", type=float, default=60, help="per-request timeout in seconds")
+    parser.add_argument("--output", default="api_benchmark_results.json", help="JSON report (default: %(default)s)")
+    args = parser.parse_args()
+
+    all_locations = expand_locations(args.locations.split(','), args.locations_file)
+    location_counts = sorted({len(all_locations) if count <= 0 else min(count, len(all_locations)) for count in args.location_counts})
+
+    results = []
+    for endpoint in args.endpoints.split(','):
+        route = ENDPOINTS[endpoint]
+        for count in location_counts:
+            for window_hours in args.windows:
+                for concurrency in args.concurrency:
+                    cell = run_cell(args.base_url, route, all_locations[:count], window_hours, concurrency,
+                                    args.requests, args.start, args.timeout)
+                    cell.update({"endpoint": route, "locations": count, "window_hours": window_hours, "concurrency": concurrency})
+                    results.append(cell)
+                    latency = cell["latency_ms"]
+                    print(f"{route:30} locations={count:3} window={window_hours:4}h concurrency={concurrency:3} "
+                          f"p50={latency['p50'] or 0:8.1f}ms p95={latency['p95'] or 0:8.1f}ms p99={latency['p99'] or 0:8.1f}ms "
+                          f"{cell['throughput_rps']:7.1f} req/s errors={cell['error_rate']:.0%}")
+
+    report = {
+        "base_url": args.base_url,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "requests_per_combination": args.requests,
+        "locations": all_locations,
+        "results": results,
+    }
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=4)
+    print(f"Results saved to {args.output}")